@@ -0,0 +1,176 @@
+"""
+Per-account caching of analytics results.
+
+Cache keys embed the account's data version, which every sales or client
+write bumps once its transaction commits, so a stale entry is never read
+again and just expires. Values are looked up in a bounded in-process LRU
+first and in Django's cache, shared by all processes, second.
+"""
+
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+TIMEOUT = 60 * 60
+
+
+class LocalLRU:
+    """
+    In-process cache of pickled values holding at most ``max_bytes`` of
+    them, evicting the least recently used first.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            data = self.entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return pickle.loads(data)
+
+    def set(self, key, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.hits = self.misses = 0
+
+
+local_cache = LocalLRU(settings.ANALYTICS_CACHE_MAX_BYTES)
+shared_counts = {"hits": 0, "misses": 0}
+shared_counts_lock = threading.Lock()
+
+
+def count_shared(outcome):
+    """Count a ``"hits"`` or ``"misses"`` lookup in the shared tier."""
+    with shared_counts_lock:
+        shared_counts[outcome] += 1
+
+
+def stats():
+    """Hit and miss counters of both tiers in this process."""
+    with local_cache.lock:
+        local = {
+            "hits": local_cache.hits,
+            "misses": local_cache.misses,
+            "entries": len(local_cache.entries),
+            "bytes": local_cache.size,
+            "max_bytes": local_cache.max_bytes,
+        }
+    with shared_counts_lock:
+        shared = dict(shared_counts)
+    return {"local": local, "shared": shared}
+
+
+def tiered_get(key):
+    """``(value, tier)`` of ``key``, ``(None, None)`` when neither tier has it."""
+    value = local_cache.get(key)
+    if value is not None:
+        return value, "local"
+    value = cache.get(key)
+    if value is None:
+        count_shared("misses")
+        return None, None
+    count_shared("hits")
+    local_cache.set(key, value)
+    return value, "shared"
+
+
+def tiered_set(key, value):
+    local_cache.set(key, value)
+    cache.set(key, value, TIMEOUT)
+
+
+def version_key(user_id):
+    return f"analytics:version:{user_id}"
+
+
+def data_version(user_id):
+    """Current data version of account ``user_id``."""
+    key = version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so a version lost to eviction is never reused.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_data_version(user_id):
+    """Invalidate everything cached for account ``user_id``."""
+    try:
+        cache.incr(version_key(user_id))
+    except ValueError:
+        # Not set: the next read starts a fresh version anyway.
+        pass
+
+
+def data_changed(user_ids):
+    """Bump the versions of ``user_ids`` once the current transaction commits."""
+    for user_id in set(user_ids):
+        if user_id is not None:
+            transaction.on_commit(lambda user_id=user_id: bump_data_version(user_id))
+
+
+def cache_key(user_id, name, params):
+    digest = hashlib.md5(repr(params).encode()).hexdigest()
+    return f"analytics:{user_id}:{data_version(user_id)}:{name}:{digest}"
+
+
+def cache_response(get):
+    """
+    Cache successful responses of an analytics ``get`` per account, view,
+    query parameters and day until the account's data changes. The
+    ``X-Cache`` header tells which tier answered, if any.
+    """
+
+    @wraps(get)
+    def wrapper(view, request, *args, **kwargs):
+        params = (
+            sorted(request.query_params.lists()),
+            sorted(kwargs.items()),
+            date.today(),
+        )
+        key = cache_key(request.user.pk, type(view).__name__, params)
+        data, tier = tiered_get(key)
+        if data is not None:
+            response = Response(data)
+        else:
+            response = get(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                tiered_set(key, response.data)
+        response["X-Cache"] = tier or "miss"
+        return response
+
+    return wrapper
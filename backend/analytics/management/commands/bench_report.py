@@ -0,0 +1,87 @@
+import shutil
+import timeit
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.template import Context, Template
+
+from analytics.management.seed import seed_tenant
+from analytics.utils import bill_annotations, bill_totals, monthly_report
+from sales.models import BillDetail
+from utils.pdf_generator import render_report_pdf
+
+# Stand-in for the report template the pdfkit path rendered.
+REPORT_HTML = Template("""<html><body><h1>GST REPORT {{ month }} {{ year }}</h1>
+    <p>Bills: {{ total_bills }} Total: {{ reports.total_amount }}</p>
+    <table>{% for bill in bills %}<tr><td>{{ bill.billno }}</td>
+    <td>{{ bill.date }}</td><td>{{ bill.party.name }}</td>
+    <td>{{ bill.total_amount_without_gst }}</td><td>{{ bill.total_cgst }}</td>
+    <td>{{ bill.total_sgst }}</td><td>{{ bill.total_igst }}</td>
+    <td>{{ bill.total_amount }}</td></tr>{% endfor %}</table></body></html>""")
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the monthly GST report on a seeded test database: the old "
+        "three-query aggregation and pdfkit render against the single query "
+        "and ReportLab render. pdfkit is skipped without wkhtmltopdf."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bills", type=int, default=500, help="In the month.")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        creation = connection.creation
+        old_name = creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            user = seed_tenant(0, options["bills"], 1, date(2025, 5, 1), days=31)
+            self.run(user, options["repeat"])
+        finally:
+            creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, user, repeat):
+        filters = {"date__month": 5, "date__year": 2025, "party__user": user}
+
+        def legacy_queries():
+            report = BillDetail.objects.filter(**filters).aggregate(**bill_totals())
+            total_bills = BillDetail.objects.filter(**filters).count()
+            bills = list(
+                BillDetail.objects.filter(**filters)
+                .select_related("party")
+                .annotate(**bill_annotations())
+            )
+            return {"reports": report, "total_bills": total_bills, "bills": bills}
+
+        def single_query():
+            return monthly_report(user, 2025, 5)
+
+        def best(func):
+            return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+        report = single_query()
+        results = [
+            ("legacy queries (3)", best(legacy_queries)),
+            ("single query", best(single_query)),
+            ("reportlab render", best(lambda: render_report_pdf(report))),
+        ]
+
+        if shutil.which("wkhtmltopdf"):
+            import pdfkit
+
+            context = Context({**legacy_queries(), "month": "May", "year": 2025})
+            html = REPORT_HTML.render(context)
+            results.append(
+                (
+                    "pdfkit render",
+                    best(lambda: pdfkit.from_string(html, output_path=False)),
+                )
+            )
+        else:
+            self.stdout.write("pdfkit render skipped: wkhtmltopdf is not installed")
+
+        for name, ms in results:
+            self.stdout.write(f"{name:<20} {ms:9.2f} ms")
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.models import MonthlyHsnRollup, MonthlySalesRollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the monthly sales and HSN rollups from the stored bills, "
+        "quotations and line items, e.g. after a backfill that bypassed the ORM."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="users",
+            metavar="EMAIL",
+            help="Only rebuild this account; repeat for several. Default: all.",
+        )
+
+    def handle(self, *args, **options):
+        users = None
+        if options["users"]:
+            users = list(get_user_model().objects.filter(email__in=options["users"]))
+            missing = set(options["users"]) - {user.email for user in users}
+            if missing:
+                raise CommandError(f"Unknown accounts: {', '.join(sorted(missing))}")
+
+        rows = MonthlySalesRollup.objects.rebuild(users)
+        hsn_rows = MonthlyHsnRollup.objects.rebuild(users)
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {rows} sales and {hsn_rows} HSN rollup rows.")
+        )
@@ -0,0 +1,76 @@
+"""Synthetic tenants for the query plan tests and the report benchmark."""
+
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from analytics.models import MonthlySalesRollup
+from clients.models import Client
+from sales.models import BillDetail, ProductDetail, QProductDetail, QuotationDetail
+from sales.tax import round_paise
+from users.models import Account
+
+
+def seed_tenant(n, bills, lines, start=date(2024, 4, 1), days=730):
+    """
+    Create account ``n`` with 20 clients, ``bills`` bills and half as many
+    quotations dated within ``days`` of ``start``, each with ``lines`` lines.
+    """
+    rng = random.Random(n)
+    user = Account.objects.create_user(
+        email=f"plans{n}@example.com",
+        username=f"plans{n}",
+        company_name=f"Tenant {n}",
+        gstin=f"PLANS{n}",
+        pan=f"PLANS{n}",
+    )
+    clients = Client.objects.bulk_create(
+        Client(user=user, name=f"Party {i}") for i in range(20)
+    )
+
+    documents = []
+    for i in range(bills):
+        subtotal = Decimal(rng.randrange(10000, 1000000)) / 100
+        half_gst = round_paise(subtotal * Decimal("0.09"))
+        documents.append(
+            BillDetail(
+                party=rng.choice(clients),
+                user=user,
+                billno=f"T{n}-B{i}",
+                date=start + timedelta(days=rng.randrange(days)),
+                is_paid=rng.random() < 0.5,
+                subtotal_amount=subtotal,
+                total_cgst_amount=half_gst,
+                total_sgst_amount=half_gst,
+                total_gst_amount=2 * half_gst,
+                total_amount_after_gst=subtotal + 2 * half_gst,
+                total_units=lines,
+            )
+        )
+    BillDetail.objects.bulk_create(documents)
+    ProductDetail.objects.bulk_create(
+        ProductDetail(billno=bill, unit_price=Decimal("10"), cgst=9, sgst=9)
+        for bill in documents
+        for _ in range(lines)
+    )
+    MonthlySalesRollup.objects.add_documents(documents)
+
+    documents = []
+    for i in range(bills // 2):
+        documents.append(
+            QuotationDetail(
+                party=rng.choice(clients),
+                user=user,
+                quotationno=f"T{n}-Q{i}",
+                date=start + timedelta(days=rng.randrange(days)),
+                subject="Plans",
+            )
+        )
+    QuotationDetail.objects.bulk_create(documents)
+    MonthlySalesRollup.objects.add_documents(documents)
+    QProductDetail.objects.bulk_create(
+        QProductDetail(quotationno=quotation, unit_price=Decimal("10"), igst=18)
+        for quotation in documents
+        for _ in range(lines)
+    )
+    return user
@@ -0,0 +1,332 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from sales.tax import round_paise
+
+from .cache import data_changed
+
+# Rollup field: document field it sums, per document type. ``paid_*`` only
+# count paid bills.
+BILL_SUMS = {
+    "bill_subtotal": "subtotal_amount",
+    "bill_cgst": "total_cgst_amount",
+    "bill_sgst": "total_sgst_amount",
+    "bill_igst": "total_igst_amount",
+    "bill_gst": "total_gst_amount",
+    "bill_amount": "total_amount_after_gst",
+}
+PAID_SUMS = {
+    "paid_amount": "total_amount_after_gst",
+    "paid_gst": "total_gst_amount",
+}
+QUOTATION_SUMS = {
+    "quotation_gst": "total_gst_amount",
+    "quotation_amount": "total_amount_after_gst",
+}
+
+# Stored document fields a rollup contribution depends on.
+BILL_STATE_FIELDS = ["party_id", "date", "is_paid", *BILL_SUMS.values()]
+QUOTATION_STATE_FIELDS = ["party_id", "date", *QUOTATION_SUMS.values()]
+
+
+def rollup_period(day):
+    """``(year, month)`` row of a document dated ``day``; undated ones go to 0, 0."""
+    if day is None:
+        return 0, 0
+    return day.year, day.month
+
+
+def bill_contribution(state):
+    """Rollup deltas a bill with stored values ``state`` adds to its month."""
+    values = {"bill_count": 1}
+    for field, source in BILL_SUMS.items():
+        values[field] = state[source] or 0
+    if state["is_paid"]:
+        values["paid_count"] = 1
+        for field, source in PAID_SUMS.items():
+            values[field] = state[source] or 0
+    return values
+
+
+def quotation_contribution(state):
+    values = {"quotation_count": 1}
+    for field, source in QUOTATION_SUMS.items():
+        values[field] = state[source] or 0
+    return values
+
+
+def state_fields(model):
+    """Stored fields of ``model`` its rollup contribution depends on."""
+    from sales.models import BillDetail
+
+    return BILL_STATE_FIELDS if model is BillDetail else QUOTATION_STATE_FIELDS
+
+
+def contribution_of(model):
+    from sales.models import BillDetail
+
+    return bill_contribution if model is BillDetail else quotation_contribution
+
+
+def bill_aggregates():
+    """Aggregates over bills matching ``bill_contribution``."""
+    paid = Q(is_paid=True)
+    return {
+        "bill_count": Count("id"),
+        **{field: Sum(source) for field, source in BILL_SUMS.items()},
+        "paid_count": Count("id", filter=paid),
+        **{field: Sum(source, filter=paid) for field, source in PAID_SUMS.items()},
+    }
+
+
+def quotation_aggregates():
+    return {
+        "quotation_count": Count("id"),
+        **{field: Sum(source) for field, source in QUOTATION_SUMS.items()},
+    }
+
+
+class RollupManager(models.Manager):
+    """Rollup rows identified by ``key_fields`` and kept current with deltas."""
+
+    key_fields = ()
+
+    def value_fields(self):
+        """The summed fields of a row, everything but the key."""
+        return [
+            field.attname
+            for field in self.model._meta.concrete_fields
+            if not field.primary_key and field.attname not in self.key_fields
+        ]
+
+    def apply(self, key, deltas):
+        """
+        Add ``deltas`` to the row with ``key`` values, creating it when
+        missing and deleting it when every sum drops back to zero, as a
+        rebuild would not produce it. Only positive changes create rows, so
+        removing a document of an account being deleted never recreates its
+        rows.
+        """
+        deltas = {field: value for field, value in deltas.items() if value}
+        if not deltas:
+            return
+        key = dict(zip(self.key_fields, key))
+        increments = {field: models.F(field) + value for field, value in deltas.items()}
+        if self.filter(**key).update(**increments):
+            if any(value < 0 for value in deltas.values()):
+                self.filter(**key, **dict.fromkeys(self.value_fields(), 0)).delete()
+            return
+        if all(value < 0 for value in deltas.values()):
+            return
+        try:
+            with transaction.atomic():
+                self.create(**key, **deltas)
+        except IntegrityError:
+            # Created concurrently since the UPDATE above.
+            self.filter(**key).update(**increments)
+
+    def apply_changes(self, changes):
+        """Apply ``{key: deltas}`` in one transaction."""
+        with transaction.atomic():
+            for key, deltas in sorted(changes.items()):
+                self.apply(key, deltas)
+
+
+class MonthlySalesRollupManager(RollupManager):
+    key_fields = ("user_id", "year", "month")
+
+    def record(self, model, old=(), new=()):
+        """
+        Take the contributions of the ``old`` stored states of ``model``
+        documents out of their months and add those of the ``new`` ones. A
+        state maps ``user_id`` and the ``state_fields(model)`` to values.
+        """
+        contribution = contribution_of(model)
+        changes = defaultdict(lambda: defaultdict(int))
+        for states, sign in ((old, -1), (new, 1)):
+            for state in states:
+                key = (state["user_id"], *rollup_period(state["date"]))
+                for field, value in contribution(state).items():
+                    changes[key][field] += sign * value
+        self.apply_changes(changes)
+        data_changed(state["user_id"] for state in (*old, *new))
+
+    def add_documents(self, documents):
+        """Count freshly bulk-created bills or quotations, which send no signals."""
+        from clients.models import Client
+        from sales.models import BillDetail
+
+        from .models import MonthlyHsnRollup
+
+        if not documents:
+            return
+        model = type(documents[0])
+        user_ids = dict(
+            Client.objects.filter(
+                pk__in={document.party_id for document in documents}
+            ).values_list("pk", "user_id")
+        )
+        states = [
+            {
+                "user_id": user_ids[document.party_id],
+                **{field: getattr(document, field) for field in state_fields(model)},
+            }
+            for document in documents
+        ]
+        self.record(model, new=states)
+        if model is BillDetail:
+            lines = MonthlyHsnRollup.objects.bill_lines(
+                document.pk for document in documents
+            )
+            MonthlyHsnRollup.objects.record(
+                new=[
+                    (state, lines.get(bill.pk, {}))
+                    for state, bill in zip(states, documents)
+                ]
+            )
+
+    def rebuild(self, users=None):
+        """
+        Recompute the rows of ``users`` (all accounts by default) from the
+        stored bills and quotations. Returns the number of rows written.
+        """
+        from sales.models import BillDetail, QuotationDetail
+
+        rows = defaultdict(dict)
+        sources = (
+            (BillDetail.objects.all(), bill_aggregates()),
+            (QuotationDetail.objects.all(), quotation_aggregates()),
+        )
+        for queryset, aggregates in sources:
+            if users is not None:
+                queryset = queryset.filter(party__user__in=users)
+            grouped = (
+                queryset.annotate(year=ExtractYear("date"), month=ExtractMonth("date"))
+                .values("party__user", "year", "month")
+                .annotate(**aggregates)
+                .order_by()
+            )
+            for row in grouped:
+                key = (
+                    row.pop("party__user"),
+                    row.pop("year") or 0,
+                    row.pop("month") or 0,
+                )
+                rows[key].update({field: value or 0 for field, value in row.items()})
+
+        with transaction.atomic():
+            stale = self.all()
+            if users is not None:
+                stale = stale.filter(user__in=users)
+            stale.delete()
+            self.bulk_create(
+                [
+                    self.model(user_id=user_id, year=year, month=month, **values)
+                    for (user_id, year, month), values in sorted(rows.items())
+                ],
+                batch_size=1000,
+            )
+        return len(rows)
+
+
+# Summed fields of a line item group, as named by ``LineItemQuerySet.tax_summary``.
+HSN_SUMS = [
+    "quantity",
+    "taxable_value",
+    "cgst_amount",
+    "sgst_amount",
+    "igst_amount",
+    "total_gst",
+]
+
+
+def hsn_group(row):
+    """``(hsncode, unit_type)`` rollup key of a summary row; blanks become 0 and ""."""
+    return row["hsncode"] or 0, row["unit_type"] or ""
+
+
+def hsn_sums(row):
+    """The ``HSN_SUMS`` of a summary row, amounts rounded to paise."""
+    sums = {"quantity": row["quantity"] or 0}
+    for field in HSN_SUMS[1:]:
+        sums[field] = round_paise(Decimal(row[field] or 0))
+    return sums
+
+
+class MonthlyHsnRollupManager(RollupManager):
+    key_fields = ("user_id", "year", "month", "hsncode", "unit_type")
+
+    def bill_lines(self, bill_ids):
+        """``{bill_id: {(hsncode, unit_type): sums}}`` of the bills' line items."""
+        from sales.models import ProductDetail
+
+        lines = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+        summary = ProductDetail.objects.filter(billno__in=list(bill_ids)).tax_summary(
+            "billno", "hsncode", "unit_type"
+        )
+        # NULL and 0 (or NULL and "") are separate groups sharing one key
+        for row in summary:
+            for field, value in hsn_sums(row).items():
+                lines[row["billno"]][hsn_group(row)][field] += value
+        return lines
+
+    def record(self, old=(), new=()):
+        """
+        Take the line sums of the ``old`` bills out of their months and add
+        those of the ``new`` ones. Each bill is a ``(state, lines)`` pair of
+        its rollup state and its ``bill_lines``.
+        """
+        changes = defaultdict(lambda: defaultdict(int))
+        for bills, sign in ((old, -1), (new, 1)):
+            for state, lines in bills:
+                month = (state["user_id"], *rollup_period(state["date"]))
+                for group, sums in lines.items():
+                    for field, value in sums.items():
+                        changes[(*month, *group)][field] += sign * value
+        self.apply_changes(changes)
+
+    def rebuild(self, users=None):
+        """
+        Recompute the rows of ``users`` (all accounts by default) from the
+        stored line items. Returns the number of rows written.
+        """
+        from sales.models import ProductDetail
+
+        lines = ProductDetail.objects.all()
+        if users is not None:
+            lines = lines.filter(billno__party__user__in=users)
+        summary = lines.annotate(
+            user=models.F("billno__party__user"),
+            year=ExtractYear("billno__date"),
+            month=ExtractMonth("billno__date"),
+        ).tax_summary("user", "year", "month", "hsncode", "unit_type")
+        groups = defaultdict(lambda: defaultdict(int))
+        for row in summary.iterator():
+            key = (row["user"], row["year"] or 0, row["month"] or 0, *hsn_group(row))
+            for field, value in hsn_sums(row).items():
+                groups[key][field] += value
+        rows = [
+            self.model(
+                user_id=user_id,
+                year=year,
+                month=month,
+                hsncode=hsncode,
+                unit_type=unit_type,
+                **sums,
+            )
+            for (user_id, year, month, hsncode, unit_type), sums in sorted(
+                groups.items()
+            )
+        ]
+
+        with transaction.atomic():
+            stale = self.all()
+            if users is not None:
+                stale = stale.filter(user__in=users)
+            stale.delete()
+            self.bulk_create(rows, batch_size=1000)
+        return len(rows)
@@ -0,0 +1,73 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def fill_sales_rollup(apps, schema_editor):
+    """
+    Write the rows ``MonthlySalesRollup.objects.rebuild()`` computes, so the
+    bills and quotations stored before the rollup existed are counted.
+    """
+    MonthlySalesRollup = apps.get_model("analytics", "MonthlySalesRollup")
+    paid = Q(is_paid=True)
+    sources = (
+        (
+            apps.get_model("sales", "BillDetail"),
+            {
+                "bill_count": Count("id"),
+                "bill_subtotal": Sum("subtotal_amount"),
+                "bill_cgst": Sum("total_cgst_amount"),
+                "bill_sgst": Sum("total_sgst_amount"),
+                "bill_igst": Sum("total_igst_amount"),
+                "bill_gst": Sum("total_gst_amount"),
+                "bill_amount": Sum("total_amount_after_gst"),
+                "paid_count": Count("id", filter=paid),
+                "paid_amount": Sum("total_amount_after_gst", filter=paid),
+                "paid_gst": Sum("total_gst_amount", filter=paid),
+            },
+        ),
+        (
+            apps.get_model("sales", "QuotationDetail"),
+            {
+                "quotation_count": Count("id"),
+                "quotation_gst": Sum("total_gst_amount"),
+                "quotation_amount": Sum("total_amount_after_gst"),
+            },
+        ),
+    )
+
+    rows = defaultdict(dict)
+    for model, aggregates in sources:
+        grouped = (
+            model.objects.annotate(year=ExtractYear("date"), month=ExtractMonth("date"))
+            .values("party__user", "year", "month")
+            .annotate(**aggregates)
+            .order_by()
+        )
+        for row in grouped:
+            key = (row.pop("party__user"), row.pop("year") or 0, row.pop("month") or 0)
+            rows[key].update({field: value or 0 for field, value in row.items()})
+
+    MonthlySalesRollup.objects.all().delete()
+    MonthlySalesRollup.objects.bulk_create(
+        [
+            MonthlySalesRollup(user_id=user_id, year=year, month=month, **values)
+            for (user_id, year, month), values in sorted(rows.items())
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0002_monthly_hsn_rollup"),
+        ("clients", "0002_initial"),
+        ("sales", "0002_stored_tax_totals"),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_sales_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,92 @@
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractMonth, ExtractYear, Round
+
+
+def money(expression):
+    """``expression`` rounded to paise, as ``sales.manager`` rounds line taxes."""
+    return Round(
+        models.ExpressionWrapper(
+            expression,
+            output_field=models.DecimalField(max_digits=16, decimal_places=6),
+        ),
+        2,
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def fill_hsn_rollup(apps, schema_editor):
+    """
+    Write the rows ``MonthlyHsnRollup.objects.rebuild()`` computes, so the
+    line items stored before the rollup existed are counted.
+    """
+    MonthlyHsnRollup = apps.get_model("analytics", "MonthlyHsnRollup")
+    ProductDetail = apps.get_model("sales", "ProductDetail")
+
+    amount = models.F("unit_price") * models.F("product_quantity")
+    percent = models.Value(Decimal("0.01"), output_field=models.DecimalField())
+    gst_rate = models.F("cgst") + models.F("sgst") + models.F("igst")
+    summary = (
+        ProductDetail.objects.annotate(
+            user=models.F("billno__party__user"),
+            year=ExtractYear("billno__date"),
+            month=ExtractMonth("billno__date"),
+        )
+        .values("user", "year", "month", "hsncode", "unit_type")
+        .annotate(
+            quantity=models.Sum("product_quantity"),
+            taxable_value=models.Sum(money(amount)),
+            cgst_amount=models.Sum(money(amount * models.F("cgst") * percent)),
+            sgst_amount=models.Sum(money(amount * models.F("sgst") * percent)),
+            igst_amount=models.Sum(money(amount * models.F("igst") * percent)),
+            total_gst=models.Sum(money(amount * gst_rate * percent)),
+        )
+        .order_by()
+    )
+
+    # NULL and 0 codes (and NULL and blank units) share a row
+    groups = defaultdict(lambda: defaultdict(int))
+    for row in summary.iterator():
+        key = (
+            row.pop("user"),
+            row.pop("year") or 0,
+            row.pop("month") or 0,
+            row.pop("hsncode") or 0,
+            row.pop("unit_type") or "",
+        )
+        groups[key]["quantity"] += row.pop("quantity") or 0
+        for field, value in row.items():
+            groups[key][field] += Decimal(value or 0).quantize(
+                Decimal("0.01"), ROUND_HALF_UP
+            )
+
+    MonthlyHsnRollup.objects.all().delete()
+    MonthlyHsnRollup.objects.bulk_create(
+        [
+            MonthlyHsnRollup(
+                user_id=user_id,
+                year=year,
+                month=month,
+                hsncode=hsncode,
+                unit_type=unit_type,
+                **sums,
+            )
+            for (user_id, year, month, hsncode, unit_type), sums in sorted(
+                groups.items()
+            )
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0003_fill_monthly_sales_rollup"),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_hsn_rollup, migrations.RunPython.noop),
+    ]
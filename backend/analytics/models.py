@@ -1,3 +1,100 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+from .manager import MonthlyHsnRollupManager, MonthlySalesRollupManager
+
+
+def amount_field():
+    return models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+
+class MonthlySalesRollup(models.Model):
+    """
+    Bill and quotation totals of one account in one calendar month, kept
+    current by ``analytics.signals`` so the dashboards never scan documents.
+    Undated quotations are counted under year and month 0.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+"
+    )
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+
+    bill_count = models.PositiveIntegerField(default=0)
+    bill_subtotal = amount_field()
+    bill_cgst = amount_field()
+    bill_sgst = amount_field()
+    bill_igst = amount_field()
+    bill_gst = amount_field()
+    bill_amount = amount_field()
+    paid_count = models.PositiveIntegerField(default=0)
+    paid_gst = amount_field()
+    paid_amount = amount_field()
+    quotation_count = models.PositiveIntegerField(default=0)
+    quotation_gst = amount_field()
+    quotation_amount = amount_field()
+
+    objects = MonthlySalesRollupManager()
+
+    @property
+    def unpaid_count(self):
+        return self.bill_count - self.paid_count
+
+    @property
+    def unpaid_gst(self):
+        return self.bill_gst - self.paid_gst
+
+    @property
+    def unpaid_amount(self):
+        return self.bill_amount - self.paid_amount
+
+    def __str__(self):
+        return f"{self.user_id}-{self.year}-{self.month:02d}"
+
+    class Meta:
+        db_table = "monthly_sales_rollups"
+        ordering = ("year", "month")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "year", "month"], name="unique_monthly_sales_rollup"
+            )
+        ]
+
+
+class MonthlyHsnRollup(models.Model):
+    """
+    Quantity, taxable value and GST of the bill lines of one account in one
+    calendar month with one HSN code and unit type, kept current by
+    ``analytics.signals``. Lines without either are counted under 0 and "".
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+"
+    )
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    hsncode = models.IntegerField()
+    unit_type = models.CharField(max_length=3, blank=True)
+
+    quantity = models.BigIntegerField(default=0)
+    taxable_value = amount_field()
+    cgst_amount = amount_field()
+    sgst_amount = amount_field()
+    igst_amount = amount_field()
+    total_gst = amount_field()
+
+    objects = MonthlyHsnRollupManager()
+
+    def __str__(self):
+        return f"{self.user_id}-{self.year}-{self.month:02d}-{self.hsncode}"
+
+    class Meta:
+        db_table = "monthly_hsn_rollups"
+        ordering = ("year", "month", "hsncode", "unit_type")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "year", "month", "hsncode", "unit_type"],
+                name="unique_monthly_hsn_rollup",
+            )
+        ]
@@ -0,0 +1,145 @@
+"""
+Keep ``MonthlySalesRollup`` in step with every saved or deleted bill and
+quotation and ``MonthlyHsnRollup`` with the line items of bills, and
+invalidate cached analytics when they, their line items or clients change.
+Bulk inserts send no signals; their callers use
+``MonthlySalesRollup.objects.add_documents``. Line items are only written
+in bulk or deleted along with a save or delete of their document, which
+already invalidates, so only single line saves are watched.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from clients.models import Client
+from sales.models import BillDetail, ProductDetail, QProductDetail, QuotationDetail
+
+from .cache import data_changed
+from .manager import state_fields
+from .models import MonthlyHsnRollup, MonthlySalesRollup
+
+
+def account_of(instance, party_id):
+    party = instance._state.fields_cache.get("party")
+    if party is not None and party.pk == party_id:
+        return party.user_id
+    return Client.objects.filter(pk=party_id).values_list("user_id", flat=True).first()
+
+
+def stored_state(sender, instance):
+    """
+    Rollup state of ``instance`` as last read from or written to the
+    database, or ``None`` when it was not loaded in full.
+    """
+    loaded = getattr(instance, "_loaded_values", {})
+    fields = state_fields(sender)
+    if not all(field in loaded for field in fields):
+        return None
+    state = {field: loaded[field] for field in fields}
+    if "user_id" in loaded:
+        state["user_id"] = loaded["user_id"]
+    else:
+        state["user_id"] = account_of(instance, state["party_id"])
+    return state
+
+
+def remember_state(instance, state):
+    instance._loaded_values = {**getattr(instance, "_loaded_values", {}), **state}
+
+
+@receiver(pre_save, sender=BillDetail)
+@receiver(pre_save, sender=QuotationDetail)
+def load_stored_state(sender, instance, **kwargs):
+    """
+    Read the stored state of a document that was not loaded in full, and
+    the line sums of a bill before its lines are rewritten.
+    """
+    if instance.pk is None:
+        return
+    if stored_state(sender, instance) is None:
+        state = sender.objects.filter(pk=instance.pk).values(*state_fields(sender))
+        state = state.first()
+        if state is not None:
+            remember_state(instance, state)
+    if sender is BillDetail and not hasattr(instance, "_loaded_lines"):
+        load_lines(instance)
+
+
+def load_lines(bill):
+    bill._loaded_lines = MonthlyHsnRollup.objects.bill_lines([bill.pk]).get(bill.pk, {})
+
+
+@receiver(post_save, sender=BillDetail)
+@receiver(post_save, sender=QuotationDetail)
+def document_saved(sender, instance, created, update_fields, **kwargs):
+    old = None if created else stored_state(sender, instance)
+    saved = state_fields(sender)
+    if old is not None and update_fields is not None:
+        # Fields left out of the save keep their stored values.
+        saved = {sender._meta.get_field(name).attname for name in update_fields}
+    new = {
+        field: getattr(instance, field) if field in saved else old[field]
+        for field in state_fields(sender)
+    }
+    if old is not None and old["party_id"] == new["party_id"]:
+        new["user_id"] = old["user_id"]
+    else:
+        new["user_id"] = account_of(instance, new["party_id"])
+
+    MonthlySalesRollup.objects.record(sender, old=[old] if old else [], new=[new])
+    remember_state(instance, new)
+
+    if sender is BillDetail:
+        # Lines are written after the bill is created, so a new bill has none.
+        old_lines = getattr(instance, "_loaded_lines", {})
+        if created:
+            instance._loaded_lines = {}
+        else:
+            load_lines(instance)
+        MonthlyHsnRollup.objects.record(
+            old=[(old, old_lines)] if old else [],
+            new=[(new, instance._loaded_lines)],
+        )
+
+
+@receiver(pre_delete, sender=BillDetail)
+def bill_deleting(sender, instance, **kwargs):
+    """Read the line sums of a bill before they are deleted with it."""
+    load_lines(instance)
+
+
+@receiver(post_delete, sender=BillDetail)
+@receiver(post_delete, sender=QuotationDetail)
+def document_deleted(sender, instance, **kwargs):
+    old = stored_state(sender, instance)
+    if old is None:
+        old = {field: getattr(instance, field) for field in state_fields(sender)}
+        old["user_id"] = account_of(instance, old["party_id"])
+    MonthlySalesRollup.objects.record(sender, old=[old])
+    if sender is BillDetail:
+        MonthlyHsnRollup.objects.record(old=[(old, instance._loaded_lines)])
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+def client_changed(sender, instance, **kwargs):
+    data_changed([instance.user_id])
+
+
+# Line item model: (document model, its foreign key to it).
+LINE_DOCUMENTS = {
+    ProductDetail: (BillDetail, "billno_id"),
+    QProductDetail: (QuotationDetail, "quotationno_id"),
+}
+
+
+@receiver(post_save, sender=ProductDetail)
+@receiver(post_save, sender=QProductDetail)
+def line_saved(sender, instance, **kwargs):
+    document, field = LINE_DOCUMENTS[sender]
+    user_id = (
+        document.objects.filter(pk=getattr(instance, field))
+        .values_list("party__user", flat=True)
+        .first()
+    )
+    data_changed([user_id])
@@ -1,3 +1,155 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APITestCase
+
+from analytics.cache import local_cache
+from analytics.models import MonthlyHsnRollup, MonthlySalesRollup
+from sales.tests import SalesAPITestCase, line
+from utils.query_plans import QueryPlanTestCase
+
+
+class AnalyticsQueryPlanTests(QueryPlanTestCase):
+    endpoints = [
+        "/api/v1/analytics/dashboard/",
+        "/api/v1/analytics/dashboard/?from_date=2024-04-01&to_date=2025-03-31"
+        "&is_paid=true",
+        "/api/v1/analytics/count-bill-quotation/",
+        "/api/v1/analytics/amount-bill-gst/",
+        "/api/v1/analytics/top_5_clients/",
+        "/api/v1/analytics/total_paid_unpaid/",
+        "/api/v1/analytics/hsn-summary/?financial_year=2024",
+        "/api/v1/analytics/hsn-summary/?from_date=2024-06-10&to_date=2025-02-20"
+        "&output=csv",
+    ]
+
+    def setUp(self):
+        super().setUp()
+        # Cached responses would hide the queries being checked.
+        cache.clear()
+        local_cache.clear()
+
+    def test_endpoints_use_indexes(self):
+        for url in self.endpoints:
+            with self.subTest(url=url):
+                self.assertEndpointUsesIndexes(url)
+
+    def test_rollup_querysets_use_indexes(self):
+        self.assertUsesIndexes(
+            MonthlySalesRollup.objects.filter(user=self.user, year=2024)
+        )
+        self.assertUsesIndexes(
+            MonthlyHsnRollup.objects.filter(user=self.user, year=2024, month=5)
+        )
+
+
+class AnalyticsPermissionTests(APITestCase):
+    def test_top_clients_require_authentication(self):
+        response = self.client.get("/api/v1/analytics/top_5_clients/")
+        self.assertEqual(response.status_code, 401)
+
+
+class RollupRebuildTests(SalesAPITestCase):
+    """The rollups kept by signals match what ``rebuild()`` computes."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def rows(self, model):
+        fields = [*model.objects.key_fields, *model.objects.value_fields()]
+        return sorted(model.objects.values_list(*fields))
+
+    def assertMatchesRebuild(self, model):
+        live = self.rows(model)
+        model.objects.rebuild()
+        self.assertEqual(live, self.rows(model))
+
+    def change_documents(self):
+        """Create, edit, convert, import and delete bills and quotations."""
+        first = self.create_invoice(
+            date="2025-04-10",
+            productdetails=[line(hsncode=1001, unit_type="NOS"), line(hsncode=2002)],
+        )
+        second = self.create_invoice(
+            date="2025-05-20", productdetails=[line(hsncode=1001)]
+        )
+        self.create_invoice(date="2025-05-21", is_paid=True)
+        self.as_other_user()
+        self.create_invoice(party=self.other_party, productdetails=[line(hsncode=1)])
+        self.client.force_authenticate(self.user)
+
+        # a new month and line group; the old ones drop back to zero
+        response = self.client.patch(
+            f"{self.invoices}{first['id']}/",
+            {
+                "date": "2025-06-01",
+                "is_paid": True,
+                "productdetails": [line(hsncode=3003, product_quantity=5)],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+
+        quotations = [
+            self.create_quotation(quotationdetails=[line(hsncode=2002)]),
+            self.create_quotation(date=None),
+        ]
+        response = self.client.post(
+            f"{self.invoices}create-from-quotations/",
+            {"quotation_ids": [quotation["id"] for quotation in quotations]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+
+        upload = SimpleUploadedFile(
+            "bills.csv",
+            b"party_id,date,hsncode,unit_price,product_quantity\n"
+            b"%d,2025-07-01,4004,10,1\n" % self.party.pk,
+            content_type="text/csv",
+        )
+        response = self.client.post(f"{self.invoices}import/", {"file": upload})
+        self.assertEqual(response.data["created"], 1, response.data)
+
+        for url in (
+            f"{self.invoices}{second['id']}/",
+            f"{self.quotations}{quotations[1]['id']}/",
+        ):
+            self.assertEqual(self.client.delete(url).status_code, 204)
+
+    def test_blank_hsn_codes_and_units_share_a_row(self):
+        self.create_invoice(
+            productdetails=[
+                line(hsncode=None, unit_type=None),
+                line(hsncode=0, unit_type=""),
+                line(hsncode=0, unit_type=None, unit_price="1.00"),
+            ]
+        )
+
+        rows = MonthlyHsnRollup.objects.values_list(
+            "hsncode", "unit_type", "quantity", "taxable_value"
+        )
+        self.assertEqual(list(rows), [(0, "", 6, Decimal("42.00"))])
+        self.assertMatchesRebuild(MonthlyHsnRollup)
+
+    def test_hsn_rollup_matches_rebuild(self):
+        self.change_documents()
+        self.assertMatchesRebuild(MonthlyHsnRollup)
+
+    def test_sales_rollup_matches_rebuild(self):
+        self.change_documents()
+        self.assertMatchesRebuild(MonthlySalesRollup)
+
+
+class PeriodEdgeTests(SalesAPITestCase):
+    def test_range_up_to_the_last_date_is_accepted(self):
+        self.create_invoice()
+        period = "from_date=2025-01-01&to_date=9999-12-31"
+
+        response = self.client.get(f"/api/v1/analytics/dashboard/?{period}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["bill"], 1)
+
+        response = self.client.get(f"/api/v1/analytics/hsn-summary/?{period}")
+        self.assertEqual(response.status_code, 200)
@@ -19,4 +19,15 @@ urlpatterns = [
     path(
         "total_paid_unpaid/", views.TotalPaidUnpaid.as_view(), name="total-paid-unpaid"
     ),
+    path("hsn-summary/", views.HsnSummaryView.as_view(), name="hsn-summary"),
+    path(
+        "cache-stats/",
+        views.AnalyticsCacheStatsView.as_view(),
+        name="cache-stats",
+    ),
+    path(
+        "download-report/",
+        views.DownloadReportAPIView.as_view(),
+        name="download-report",
+    ),
 ]
@@ -1,53 +1,255 @@
-from django.db.models import Sum, F, FloatField, ExpressionWrapper, Count
+import calendar
+import csv
+import json
+import operator
+from collections import defaultdict
+from datetime import date
 from decimal import Decimal
+from functools import reduce
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, Sum, F
+
+from clients.models import Client
+from sales.models import BillDetail, ProductDetail, QuotationDetail
+from utils import periods
+
+from .manager import (
+    HSN_SUMS,
+    bill_aggregates,
+    hsn_group,
+    hsn_sums,
+    quotation_aggregates,
+)
+from .models import MonthlyHsnRollup, MonthlySalesRollup
 
 
 def bill_annotations():
+    """Per-bill tax split, read from the totals stored on each bill."""
     return {
-        "total_igst": ExpressionWrapper(
-            Sum(
-                F("productdetails__igst")
-                * F("productdetails__unit_price")
-                * F("productdetails__product_quantity")
-            ),
-            output_field=FloatField(),
-        )
-        / 100,
-        "total_sgst": ExpressionWrapper(
-            Sum(
-                F("productdetails__sgst")
-                * F("productdetails__unit_price")
-                * F("productdetails__product_quantity")
-            ),
-            output_field=FloatField(),
-        )
-        / 100,
-        "total_cgst": ExpressionWrapper(
-            Sum(
-                F("productdetails__cgst")
-                * F("productdetails__unit_price")
-                * F("productdetails__product_quantity")
-            ),
-            output_field=FloatField(),
+        "total_igst": F("total_igst_amount"),
+        "total_sgst": F("total_sgst_amount"),
+        "total_cgst": F("total_cgst_amount"),
+        "total_amount_without_gst": F("subtotal_amount"),
+        "total_amount": F("total_amount_after_gst"),
+    }
+
+
+def bill_totals():
+    """Aggregates matching ``bill_annotations`` over a set of bills."""
+    return {
+        "total_igst": Sum("total_igst_amount"),
+        "total_sgst": Sum("total_sgst_amount"),
+        "total_cgst": Sum("total_cgst_amount"),
+        "total_amount_without_gst": Sum("subtotal_amount"),
+        "total_amount": Sum("total_amount_after_gst"),
+    }
+
+
+# Columns of a bill row in the monthly report; the totals are summed from them.
+REPORT_COLUMNS = [
+    "billno",
+    "date",
+    "party__name",
+    "subtotal_amount",
+    "total_cgst_amount",
+    "total_sgst_amount",
+    "total_igst_amount",
+    "total_gst_amount",
+    "total_amount_after_gst",
+]
+REPORT_TOTALS = {
+    "total_igst": "total_igst_amount",
+    "total_sgst": "total_sgst_amount",
+    "total_cgst": "total_cgst_amount",
+    "total_gst": "total_gst_amount",
+    "total_amount_without_gst": "subtotal_amount",
+    "total_amount": "total_amount_after_gst",
+}
+
+
+def monthly_report(user, year, month):
+    """
+    Bills of ``user`` dated in ``month`` of ``year`` with their count and
+    totals, all from one query.
+    """
+    bills = list(
+        BillDetail.objects.filter(
+            party__user=user, **periods.month(year, month).filter()
         )
-        / 100,
-        "total_amount_without_gst": ExpressionWrapper(
-            Sum(
-                F("productdetails__unit_price") * F("productdetails__product_quantity")
-            ),
-            output_field=FloatField(),
-        ),
-        "total_amount": ExpressionWrapper(
-            Sum(
-                F("productdetails__unit_price")
-                * F("productdetails__product_quantity")
-                * (
-                    F("productdetails__igst") / Decimal("100")
-                    + F("productdetails__cgst") / Decimal("100")
-                    + F("productdetails__sgst") / Decimal("100")
-                    + Decimal("1")
-                )
-            ),
-            output_field=FloatField(),
-        ),
+        .order_by("date", "billno")
+        .values(*REPORT_COLUMNS)
+    )
+    totals = {
+        name: sum((bill[column] or 0 for bill in bills), Decimal("0"))
+        for name, column in REPORT_TOTALS.items()
+    }
+    return {
+        "seller": {"company_name": user.company_name, "gstin": user.gstin},
+        "month_name": calendar.month_name[month],
+        "year": year,
+        "bills": bills,
+        "total_bills": len(bills),
+        "totals": totals,
     }
+
+
+def rollup_months(period):
+    """Rollup rows of the months from ``period.start`` up to ``period.end``."""
+    start, end = period
+    if start.year == end.year:
+        return Q(year=start.year, month__gte=start.month, month__lt=end.month)
+    return (
+        Q(year=start.year, month__gte=start.month)
+        | Q(year__gt=start.year, year__lt=end.year)
+        | Q(year=end.year, month__lt=end.month)
+    )
+
+
+def split_period(period, field="date"):
+    """
+    ``(months, days)``: the rollup rows of the whole months within
+    ``period`` and a ``Q`` over ``field`` for the days of the partly
+    covered first and last months, ``None`` when there are none.
+    """
+    start, end = period
+    first = start if start.day == 1 else periods.month_of(start).end
+    after = end.replace(day=1)
+    if first < after:
+        months = rollup_months(periods.Period(first, after))
+        partial = [periods.Period(start, first), periods.Period(after, end)]
+    else:
+        months = Q(pk__in=[])
+        partial = [period]
+    partial = [Q(**days.filter(field)) for days in partial if days.start < days.end]
+    return months, reduce(operator.or_, partial) if partial else None
+
+
+def rollup_totals(user, period=None):
+    """
+    Totals of the ``MonthlySalesRollup`` fields over the bills and quotations
+    of ``user`` dated within ``period``, or over all of them. Whole months
+    are summed from the rollup rows; the days of a partly covered first or
+    last month are summed from the documents themselves.
+    """
+    fields = [*bill_aggregates(), *quotation_aggregates()]
+    rows = MonthlySalesRollup.objects.filter(user=user)
+    days = None
+    if period is not None:
+        months, days = split_period(period)
+        rows = rows.filter(months)
+
+    totals = rows.aggregate(**{field: Sum(field) for field in fields})
+    if days is not None:
+        for model, aggregates in (
+            (BillDetail, bill_aggregates()),
+            (QuotationDetail, quotation_aggregates()),
+        ):
+            sums = model.objects.filter(days, party__user=user).aggregate(**aggregates)
+            for field, value in sums.items():
+                totals[field] = (totals[field] or 0) + (value or 0)
+    return {field: value or 0 for field, value in totals.items()}
+
+
+def dashboard_totals(user, period=None):
+    """``rollup_totals`` plus the account's client count."""
+    totals = rollup_totals(user, period)
+    totals["party_count"] = Client.objects.filter(user=user).count()
+    return totals
+
+
+def requested_period(params):
+    """
+    The ``Period`` picked by query ``params``: ``from_date`` and ``to_date``
+    (YYYY-MM-DD, both included), ``year`` and ``month``, or
+    ``financial_year`` with an optional ``quarter``; by default the current
+    financial year to date. Raises ``ValueError`` on invalid input.
+    """
+    if params.get("from_date") or params.get("to_date"):
+        first = date.fromisoformat(params.get("from_date", ""))
+        last = date.fromisoformat(params.get("to_date", ""))
+        if first > last:
+            raise ValueError("from_date is after to_date")
+        return periods.between(first, last)
+    if params.get("month") or params.get("year"):
+        return periods.month(int(params.get("year", "")), int(params.get("month", "")))
+    if params.get("financial_year"):
+        financial_year = int(params["financial_year"])
+        if params.get("quarter"):
+            return periods.quarter(financial_year, int(params["quarter"]))
+        return periods.financial_year(financial_year)
+    return periods.financial_year_to_date()
+
+
+# Columns of the HSN-wise summary, in export order.
+HSN_COLUMNS = [
+    "hsncode",
+    "unit_type",
+    "quantity",
+    "taxable_value",
+    "cgst_amount",
+    "sgst_amount",
+    "igst_amount",
+    "total_gst",
+    "total_value",
+]
+
+
+def hsn_summary(user, period):
+    """
+    HSN-wise totals of the lines of ``user``'s bills dated within
+    ``period``, one row per HSN code and unit type in that order. Whole
+    months are summed from ``MonthlyHsnRollup``; the lines of a partly
+    covered first or last month with one grouped query over them.
+    """
+    months, days = split_period(period, "billno__date")
+    sources = [
+        MonthlyHsnRollup.objects.filter(months, user=user)
+        .values("hsncode", "unit_type")
+        .annotate(**{field: Sum(field) for field in HSN_SUMS})
+        .order_by()
+    ]
+    if days is not None:
+        sources.append(
+            ProductDetail.objects.filter(days, billno__party__user=user)
+            .tax_summary("hsncode", "unit_type")
+            .order_by()
+        )
+
+    groups = defaultdict(lambda: defaultdict(int))
+    for source in sources:
+        for row in source:
+            for field, value in hsn_sums(row).items():
+                groups[hsn_group(row)][field] += value
+
+    for (hsncode, unit_type), sums in sorted(groups.items()):
+        yield {
+            "hsncode": hsncode or None,
+            "unit_type": unit_type or None,
+            **sums,
+            "total_value": sums["taxable_value"] + sums["total_gst"],
+        }
+
+
+class Echo:
+    """File-like sink for ``csv.writer`` that hands back what is written."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([row[column] for column in columns])
+
+
+def stream_json(rows, columns):
+    yield '{"data": ['
+    separator = ""
+    for row in rows:
+        data = {column: row[column] for column in columns}
+        yield separator + json.dumps(data, cls=DjangoJSONEncoder)
+        separator = ", "
+    yield "]}"
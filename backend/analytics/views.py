@@ -1,96 +1,61 @@
 from rest_framework import permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.utils import timezone
 
-from utils.common import get_current_financial_date, MONTHS
-from sales.models import QuotationDetail, BillDetail
+from utils import periods
+from utils.common import MONTHS
+from sales.models import BillDetail
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Case, When, F, FloatField
-from django.db.models.functions import ExtractMonth
-from django.db.models import Count
 from datetime import date, datetime
-from clients.models import Client
 
 from django.db.models import Sum
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils.dateparse import parse_date
-
-
-import calendar
-import pdfkit
-from django.template import loader
-from django.http import HttpResponse
-from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
-from .utils import bill_annotations
-
-
-# Download invoice & quotation month wise
+from django.http import StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+
+from sales.pdf import pdf_response
+from utils.pdf_generator import render_report_pdf
+from . import cache
+from .cache import cache_response
+from .models import MonthlySalesRollup
+from .utils import (
+    HSN_COLUMNS,
+    dashboard_totals,
+    hsn_summary,
+    monthly_report,
+    requested_period,
+    rollup_months,
+    rollup_totals,
+    stream_csv,
+    stream_json,
+)
+
+
+# Download the month's GST report
 class DownloadReportAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, format=None):
-        month = int(request.data.get("month"))
-        year = int(request.data.get("year"))
-        user = request.user
-
-        # --- Filters ---
-        bill_filters = {"date__month": month, "date__year": year, "party__user": user}
-
-        # --- Aggregated report ---
-        report = BillDetail.objects.filter(**bill_filters).aggregate(
-            **bill_annotations()
-        )
-        total_bills = BillDetail.objects.filter(**bill_filters).count()
-
-        # --- Purchase bills ---
-        purchase_filters = {
-            "bill_date__month": month,
-            "bill_date__year": year,
-            "user": user,
-        }
-        purchase_bills = BillDetail.objects.filter(**purchase_filters).aggregate(
-            total_gst=Sum("bill_gst"),
-            total_bills_amount=Sum("bill_amount"),
-            total_bills=Count("id"),
-        )
+        try:
+            month = int(request.data.get("month"))
+            year = int(request.data.get("year"))
+            date(year, month, 1)
+        except (TypeError, ValueError):
+            return Response({"error": "Send a valid month and year."}, status=400)
 
-        # --- Bills with annotation per bill ---
-        bills = BillDetail.objects.filter(**bill_filters).annotate(**bill_annotations())
-
-        # --- GST difference ---
-        t_total_cgst = float(report.get("total_cgst") or 0)
-        t_total_igst = float(report.get("total_igst") or 0)
-        t_total_sgst = float(report.get("total_sgst") or 0)
-        p_total_gst = float(purchase_bills.get("total_gst") or 0)
-        gst_to_be_paid = (t_total_cgst + t_total_igst + t_total_sgst) - p_total_gst
-
-        # --- Context ---
-        context = {
-            "reports": report,
-            "month": calendar.month_name[month],
-            "year": year,
-            "total_bills": total_bills,
-            "bills": bills,
-            "user": user,
-            "purchase_bills": purchase_bills,
-            "gst_to_be_paid": gst_to_be_paid,
-        }
-
-        # --- Render to PDF ---
-        html = loader.render_to_string("general/report_pdf.html", context)
-        output = pdfkit.from_string(html, output_path=False)
-        response = HttpResponse(content_type="application/pdf")
-        response.write(output)
-        return response
+        report = monthly_report(request.user, year, month)
+        content = render_report_pdf(report)
+        return pdf_response(request, content, f"gst-report-{year}-{month:02d}.pdf")
 
 
 class DashboardAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cache_response
     def get(self, request):
         """
         Dashboard summary API
@@ -104,39 +69,40 @@ class DashboardAPIView(APIView):
         to_date = request.query_params.get("to_date")
         is_paid = request.query_params.get("is_paid", "false").lower() == "true"
 
-        # --- Filters ---
-        bill_filters = {"party__user": user, "is_paid": is_paid}
-        quotation_filters = {"party__user": user}
-
         if from_date and to_date:
             try:
                 from_date = datetime.strptime(from_date, "%Y-%m-%d").date()
                 to_date = datetime.strptime(to_date, "%Y-%m-%d").date()
-                bill_filters["date__range"] = (from_date, to_date)
-                quotation_filters["date__range"] = (from_date, to_date)
             except ValueError:
                 return Response(
                     {"error": "Invalid date format. Use YYYY-MM-DD."}, status=400
                 )
+            totals = dashboard_totals(user, periods.between(from_date, to_date))
+        else:
+            totals = dashboard_totals(user)
 
         # --- Bill Calculations ---
-        bill_qs = BillDetail.objects.filter(**bill_filters)
-        bill_calculation = bill_qs.aggregate(
-            total_amount_with_gst=Sum("total_amount_after_gst"),
-            total_gst=Sum("total_gst_amount"),
-        )
-        bill_count = bill_qs.count()
+        bill_count = totals["paid_count"]
+        bill_calculation = {
+            "total_amount_with_gst": totals["paid_amount"],
+            "total_gst": totals["paid_gst"],
+        }
+        if not is_paid:
+            bill_count = totals["bill_count"] - bill_count
+            bill_calculation = {
+                "total_amount_with_gst": totals["bill_amount"] - totals["paid_amount"],
+                "total_gst": totals["bill_gst"] - totals["paid_gst"],
+            }
 
         # --- Quotation Calculations ---
-        quotation_qs = QuotationDetail.objects.filter(**quotation_filters)
-        quotation_calculations = quotation_qs.aggregate(
-            q_total_amount_with_gst=Sum("total_amount_after_gst"),
-            q_total_gst=Sum("total_gst_amount"),
-        )
-        quotation_count = quotation_qs.count()
+        quotation_calculations = {
+            "q_total_amount_with_gst": totals["quotation_amount"],
+            "q_total_gst": totals["quotation_gst"],
+        }
+        quotation_count = totals["quotation_count"]
 
         # --- Party Count ---
-        party_count = Client.objects.filter(user=user).count()
+        party_count = totals["party_count"]
 
         # --- Safe Calculations (avoid None) ---
         total_amount_with_gst = bill_calculation["total_amount_with_gst"] or 0
@@ -167,38 +133,27 @@ class DashboardAPIView(APIView):
 
 
 class BillQuotationCountView(APIView):
-    permission_classes = [permissions.AllowAny]
+    permission_classes = [IsAuthenticated]
 
+    @cache_response
     def get(self, request, format=None):
         user = request.user
         year = date.today().year - 1
 
-        # --- Aggregate bills by month ---
-        bills_by_month = (
-            BillDetail.objects.filter(date__year=year, party__user=user)
-            .annotate(month=ExtractMonth("date"))
-            .values("month")
-            .annotate(count=Count("id"))
-            .order_by("month")
-        )
-        bills_dict = {item["month"]: item["count"] for item in bills_by_month}
-
-        # --- Aggregate quotations by month ---
-        quotations_by_month = (
-            QuotationDetail.objects.filter(date__year=year, party__user=user)
-            .annotate(month=ExtractMonth("date"))
-            .values("month")
-            .annotate(count=Count("id"))
-            .order_by("month")
-        )
-        quotations_dict = {item["month"]: item["count"] for item in quotations_by_month}
+        # --- Read the year's monthly rollups ---
+        counts = {
+            row["month"]: row
+            for row in MonthlySalesRollup.objects.filter(user=user, year=year).values(
+                "month", "bill_count", "quotation_count"
+            )
+        }
 
         # --- Prepare final data ---
         data = [
             {
                 "month": MONTHS[i],
-                "bills": bills_dict.get(i, 0),
-                "quotation": quotations_dict.get(i, 0),
+                "bills": counts.get(i, {}).get("bill_count", 0),
+                "quotation": counts.get(i, {}).get("quotation_count", 0),
             }
             for i in range(1, 13)
         ]
@@ -207,31 +162,16 @@ class BillQuotationCountView(APIView):
 
 
 class BillGstAmountView(APIView):
-    permission_classes = [permissions.AllowAny]
+    permission_classes = [IsAuthenticated]
 
+    @cache_response
     def get(self, request, format=None):
         user = request.user
-        current_date = timezone.now()
 
-        # Get start of financial year
-        financial_year_start = timezone.make_aware(
-            timezone.datetime(current_date.year, 4, 1)
-        )
-        if current_date < financial_year_start:
-            financial_year_start = timezone.make_aware(
-                timezone.datetime(current_date.year - 1, 4, 1)
-            )
-
-        # Aggregate bills and GST per month
-        qs = (
-            BillDetail.objects.filter(date__gte=financial_year_start, party__user=user)
-            .annotate(month=ExtractMonth("date"))
-            .values("month")
-            .annotate(
-                bill_amount=Sum("total_amount_after_gst"),
-                gst_amount=Sum("total_gst_amount"),
-            )
-        )
+        # Monthly rollups of the current financial year
+        qs = MonthlySalesRollup.objects.filter(
+            rollup_months(periods.financial_year_of(date.today())), user=user
+        ).values("month", "bill_amount", "bill_gst")
 
         amounts = {row["month"]: row for row in qs}
 
@@ -240,7 +180,7 @@ class BillGstAmountView(APIView):
             {
                 "month": MONTHS[i],
                 "bill_amount": amounts.get(i, {}).get("bill_amount") or 0,
-                "gst_amount": amounts.get(i, {}).get("gst_amount") or 0,
+                "gst_amount": amounts.get(i, {}).get("bill_gst") or 0,
             }
             for i in range(1, 13)
         ]
@@ -249,16 +189,16 @@ class BillGstAmountView(APIView):
 
 
 class Top5Clients(APIView):
-    permission_classes = [permissions.AllowAny]
+    permission_classes = [IsAuthenticated]
 
+    @cache_response
     def get(self, request, format=None):
-        end_date, start_date = get_current_financial_date()
         user = request.user
 
         # Aggregate bills directly by client
         top_clients = (
             BillDetail.objects.filter(
-                date__range=(start_date, end_date), party__user=user
+                party__user=user, **periods.financial_year_to_date().filter()
             )
             .values("party__id", "party__name")
             .annotate(amount=Sum("total_amount_after_gst"))
@@ -274,27 +214,14 @@ class Top5Clients(APIView):
 
 
 class TotalPaidUnpaid(APIView):
-    permission_classes = [permissions.AllowAny]
+    permission_classes = [IsAuthenticated]
 
+    @cache_response
     def get(self, request):
-        end_date, start_date = get_current_financial_date()
-        print(f"Showing from {start_date} to {end_date}")
-
-        qs = BillDetail.objects.filter(date__range=(start_date, end_date))
-
-        result = qs.aggregate(
-            total=Sum("total_amount_after_gst", output_field=FloatField()),
-            paid=Sum(
-                Case(
-                    When(is_paid=True, then=F("total_amount_after_gst")),
-                    default=0,
-                    output_field=FloatField(),
-                )
-            ),
-        )
+        totals = rollup_totals(request.user, periods.financial_year_to_date())
 
-        total = result["total"] or 0.0
-        paid = result["paid"] or 0.0
+        total = float(totals["bill_amount"])
+        paid = float(totals["paid_amount"])
         pending = total - paid
 
         data = [
@@ -304,3 +231,46 @@ class TotalPaidUnpaid(APIView):
         ]
 
         return Response({"data": data})
+
+
+class HsnSummaryView(APIView):
+    """
+    HSN-wise quantity, taxable value and GST of the bills in a period, for
+    GST filing. Query Params:
+        from_date, to_date (YYYY-MM-DD) | year, month |
+        financial_year, quarter (1-4) - optional, period of the bills
+        output (json/csv) - optional, json by default
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, format=None):
+        try:
+            period = requested_period(request.query_params)
+        except ValueError:
+            return Response({"error": "Send a valid period."}, status=400)
+        output = request.query_params.get("output", "json")
+        if output not in ("json", "csv"):
+            return Response({"error": "output must be json or csv."}, status=400)
+
+        rows = hsn_summary(request.user, period)
+        if output == "csv":
+            response = StreamingHttpResponse(
+                stream_csv(rows, HSN_COLUMNS), content_type="text/csv"
+            )
+            filename = f"hsn-summary-{period.start}-{period.last_day}.csv"
+            response["Content-Disposition"] = content_disposition_header(True, filename)
+        else:
+            response = StreamingHttpResponse(
+                stream_json(rows, HSN_COLUMNS), content_type="application/json"
+            )
+        return response
+
+
+class AnalyticsCacheStatsView(APIView):
+    """Hit and miss counters of the analytics cache in this process."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, format=None):
+        return Response(cache.stats())
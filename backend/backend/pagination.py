@@ -1,6 +1,17 @@
-from rest_framework.pagination import LimitOffsetPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import reduce
+from operator import and_, or_
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 
 
 class CustomPagination(LimitOffsetPagination):
@@ -17,3 +28,133 @@ class CustomPagination(LimitOffsetPagination):
 
     #     response_data.update(**kwargs)
     #     return Response(success_payload(response_data))
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only cursor pagination, newest first, over ``view.keyset_fields``
+    (e.g. ``["date", "billno", "id"]``, the last one being a unique
+    tiebreaker).
+
+    Each page continues with a WHERE on the last row's key instead of an
+    OFFSET, so deep pages cost the same as the first one, and no COUNT(*)
+    is run. NULL keys sort last. The order is fixed, so ``?ordering`` is
+    rejected.
+    """
+
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    default_limit = 20
+    max_limit = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            raise ValidationError(
+                {api_settings.ORDERING_PARAM: ["Not supported with cursor pagination."]}
+            )
+        self.request = request
+        self.keys = view.keyset_fields
+        self.limit = self.get_limit(request)
+        fields = [queryset.model._meta.get_field(key) for key in self.keys]
+        nullable = {field.name: field.null for field in fields}
+
+        queryset = queryset.order_by(
+            *(F(key).desc(nulls_last=True) for key in self.keys)
+        )
+        cursor = self.decode_cursor(request, fields)
+        if cursor is not None:
+            queryset = queryset.filter(self.after(cursor, nullable))
+
+        rows = list(queryset[: self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        self.page = rows[: self.limit]
+        return self.page
+
+    def after(self, cursor, nullable):
+        """Rows strictly after ``cursor`` in the (descending) key order."""
+        nothing = Q(pk__in=[])
+        conditions, equal = [], []
+        for key, value in zip(self.keys, cursor):
+            if value is None:
+                later = nothing
+                same = Q(**{f"{key}__isnull": True})
+            else:
+                later = Q(**{f"{key}__lt": value})
+                if nullable[key]:
+                    later |= Q(**{f"{key}__isnull": True})
+                same = Q(**{key: value})
+            conditions.append(reduce(and_, equal, later) if equal else later)
+            equal.append(same)
+        return reduce(or_, conditions)
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.default_limit
+        return max(1, min(limit, self.max_limit))
+
+    def decode_cursor(self, request, fields):
+        """
+        The key values of the cursor, converted by the key ``fields``. A
+        cursor that was not produced by ``encode_cursor`` is a 404, like
+        DRF's ``CursorPagination`` does.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode()))
+        except ValueError:
+            raise NotFound("Invalid cursor")
+        if not isinstance(cursor, list) or len(cursor) != len(fields):
+            raise NotFound("Invalid cursor")
+
+        values = []
+        for field, value in zip(fields, cursor):
+            if value is None and field.null:
+                values.append(None)
+                continue
+            if not isinstance(value, (str, int)) or isinstance(value, bool):
+                raise NotFound("Invalid cursor")
+            try:
+                values.append(field.to_python(value))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound("Invalid cursor")
+        return values
+
+    def encode_cursor(self, row):
+        values = [getattr(row, key) for key in self.keys]
+        return urlsafe_b64encode(
+            json.dumps(values, cls=DjangoJSONEncoder).encode()
+        ).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+
+class KeysetPaginationMixin:
+    """
+    Switches a view to ``KeysetPagination`` when the request asks for it
+    with ``?pagination=cursor``; the default pagination is kept otherwise.
+    """
+
+    keyset_fields = None
+
+    @property
+    def paginator(self):
+        if (
+            not hasattr(self, "_paginator")
+            and self.keyset_fields
+            and self.request.query_params.get("pagination") == "cursor"
+        ):
+            self._paginator = KeysetPagination()
+        return super().paginator
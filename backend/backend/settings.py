@@ -119,6 +119,19 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/stable/topics/cache/
+# Analytics invalidation goes through this cache, so deployments running
+# several processes must point CACHE_URL at a shared backend, e.g. redis://.
+
+CACHES = {"default": env.cache_url("CACHE_URL", default="locmemcache://")}
+
+# Memory bound of the in-process tier of the analytics cache.
+ANALYTICS_CACHE_MAX_BYTES = env.int("ANALYTICS_CACHE_MAX_BYTES", default=16 * 2**20)
+
+# Render processes of the PDF ZIP export, per web worker process.
+PDF_EXPORT_WORKERS = env.int("PDF_EXPORT_WORKERS", default=2)
+
 
 AUTH_USER_MODEL = "users.Account"
 
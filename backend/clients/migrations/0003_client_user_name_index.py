@@ -0,0 +1,21 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clients", "0002_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="client",
+            index=models.Index(
+                fields=["user", "name"], name="client_user_id_2d55bb_idx"
+            ),
+        ),
+    ]
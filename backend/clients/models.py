@@ -192,6 +192,7 @@ class Client(models.Model):
     class Meta:
         db_table = "client"
         ordering = ("-id",)
+        indexes = [models.Index(fields=["user", "name"])]
 
     def save(self, *args, **kwargs):
         get_state = [
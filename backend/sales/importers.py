@@ -0,0 +1,205 @@
+"""
+Bulk import of invoices and quotations from JSON-lines or CSV uploads.
+
+Readers turn an upload into ``(row, data, error)`` tuples, one per document,
+without loading the whole file. ``import_documents`` validates them in chunks
+with the regular transaction serializers and writes every chunk in a single
+transaction using bulk inserts.
+"""
+
+import codecs
+import csv
+import json
+from itertools import groupby, islice
+
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import as_serializer_error
+
+from analytics.models import MonthlySalesRollup
+from sales.models import DocumentSequence
+
+CHUNK_SIZE = 500
+
+# Optional CSV column grouping the rows of a document that has no number yet.
+GROUP_COLUMN = "document"
+
+
+def is_utf8(upload):
+    """Whether ``upload`` decodes as UTF-8, checked chunk by chunk."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        for chunk in upload.chunks():
+            decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    finally:
+        upload.seek(0)
+    return True
+
+
+def read_jsonl(upload):
+    """One document per line, line items nested under the related name."""
+    for row, line in enumerate(codecs.iterdecode(upload, "utf-8"), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield row, json.loads(line), None
+        except ValueError as exc:
+            yield row, None, {"error": [f"Invalid JSON: {exc}"]}
+
+
+def read_csv(upload, number_field, related_name, line_fields):
+    """
+    One line item per row, repeating the document columns.
+
+    Consecutive rows sharing the same document number make up one document.
+    Rows without a number are grouped by the ``document`` column instead and
+    each make up a document of their own without it. Blank cells are
+    treated as missing so model defaults apply.
+    """
+    reader = csv.DictReader(codecs.iterdecode(upload, "utf-8"))
+    rows = (
+        (
+            reader.line_num,
+            {k: v for k, v in record.items() if k and v not in ("", None)},
+        )
+        for record in reader
+    )
+
+    def document_key(item):
+        row, record = item
+        if record.get(number_field):
+            return number_field, record[number_field]
+        if record.get(GROUP_COLUMN):
+            return GROUP_COLUMN, record[GROUP_COLUMN]
+        return "row", row
+
+    for _, group in groupby(rows, key=document_key):
+        first_row, document, lines = None, None, []
+        for row, record in group:
+            if document is None:
+                first_row = row
+                document = {
+                    k: v
+                    for k, v in record.items()
+                    if k not in line_fields and k != GROUP_COLUMN
+                }
+            line = {k: record[k] for k in line_fields if k in record}
+            if line:
+                lines.append(line)
+        document[related_name] = lines
+        yield first_row, document, None
+
+
+def import_documents(rows, serializer_class, context, chunk_size=CHUNK_SIZE):
+    """
+    Validate and store the documents yielded by a reader.
+
+    Invalid rows are reported and skipped, they never abort the rest of the
+    file. Documents without a number are numbered from the owner's sequence.
+    Returns ``{"rows", "created", "errors"}``.
+    """
+    user = context["request"].user
+    number_field = serializer_class.number_field
+    result = {"rows": 0, "created": 0, "errors": []}
+    seen = set()
+
+    # One serializer validates every row, so its fields are only built once.
+    validator = serializer_class(context=context)
+
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        valid = []
+        for row, data, error in chunk:
+            result["rows"] += 1
+            if error is not None:
+                result["errors"].append({"row": row, "errors": error})
+                continue
+
+            try:
+                validated = validator.run_validation(data)
+            except ValidationError as exc:
+                result["errors"].append(
+                    {"row": row, "errors": as_serializer_error(exc)}
+                )
+                continue
+
+            if validated["party"].user_id != user.id:
+                result["errors"].append(
+                    {"row": row, "errors": {"party_id": ["Invalid party."]}}
+                )
+                continue
+            number = validated.get(number_field)
+            if number and number in seen:
+                result["errors"].append(
+                    {
+                        "row": row,
+                        "errors": {number_field: ["Duplicate number in this file."]},
+                    }
+                )
+                continue
+
+            seen.add(number)
+            valid.append((row, validated))
+
+        result["created"] += _write_chunk(validator, valid, result["errors"])
+
+    return result
+
+
+def _write_chunk(serializer, valid, errors):
+    """
+    Insert a validated chunk with one bulk insert for the documents and one
+    for their line items. If the chunk collides with rows written since it
+    was validated, fall back to saving it row by row so only the offending
+    rows are reported.
+    """
+    if not valid:
+        return 0
+
+    model = serializer.Meta.model
+    product_model = serializer.product_model
+    product_field = serializer.product_field
+    related_name = serializer.related_name
+
+    documents, lines = [], []
+    for _, validated in valid:
+        validated = dict(validated)
+        lines_data = validated.pop(related_name, [])
+        document = model(**validated, user_id=validated["party"].user_id)
+        document_lines = [
+            product_model(**{k: v for k, v in line.items() if k != "id"})
+            for line in lines_data
+        ]
+        document.compute_totals(document_lines)
+        documents.append(document)
+        lines.append(document_lines)
+
+    try:
+        with transaction.atomic():
+            DocumentSequence.objects.assign_numbers(
+                documents, serializer.doc_type, serializer.number_field
+            )
+            model.objects.bulk_create(documents)
+            for document, document_lines in zip(documents, lines):
+                for line in document_lines:
+                    setattr(line, product_field, document)
+            product_model.objects.bulk_create(
+                [line for document_lines in lines for line in document_lines],
+                batch_size=1000,
+            )
+            MonthlySalesRollup.objects.add_documents(documents)
+    except IntegrityError:
+        created = 0
+        for row, validated in valid:
+            try:
+                serializer.create(dict(validated))
+                created += 1
+            except IntegrityError as exc:
+                errors.append({"row": row, "errors": {"error": [str(exc)]}})
+        return created
+
+    return len(documents)
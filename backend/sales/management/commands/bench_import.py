@@ -0,0 +1,103 @@
+import io
+import json
+import time
+import uuid
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from clients.models import Client
+from sales.importers import import_documents, read_jsonl
+from sales.serializers import BillDetailSerializer
+from users.models import Account
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure bulk invoice import throughput in bills per second, next to "
+        "the one-bill-per-request path. Creates and removes its own account, "
+        "run it against a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bills", type=int, default=2000)
+        parser.add_argument("--lines", type=int, default=10)
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--baseline",
+            type=int,
+            default=200,
+            help="Bills saved one at a time for comparison (0 to skip).",
+        )
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        user = Account.objects.create_user(
+            email=f"bench-{tag}@example.com",
+            username=f"bench-{tag}",
+            company_name="Bench",
+            gstin=f"BENCH{tag}",
+            pan=f"B{tag}",
+        )
+        try:
+            party = Client.objects.create(user=user, name="Bench Party")
+            context = {"request": SimpleNamespace(user=user)}
+
+            upload = io.BytesIO(
+                b"".join(
+                    json.dumps(payload).encode() + b"\n"
+                    for payload in self.payloads(
+                        party, f"IMP-{tag}", options["bills"], options["lines"]
+                    )
+                )
+            )
+            started = time.perf_counter()
+            result = import_documents(
+                read_jsonl(upload),
+                BillDetailSerializer,
+                context,
+                chunk_size=options["chunk_size"],
+            )
+            elapsed = time.perf_counter() - started
+            self.report("bulk import", result["created"], elapsed)
+            if result["errors"]:
+                self.stderr.write(f"{len(result['errors'])} rows failed")
+
+            if options["baseline"]:
+                started = time.perf_counter()
+                for payload in self.payloads(
+                    party, f"ONE-{tag}", options["baseline"], options["lines"]
+                ):
+                    serializer = BillDetailSerializer(data=payload, context=context)
+                    serializer.is_valid(raise_exception=True)
+                    serializer.save()
+                elapsed = time.perf_counter() - started
+                self.report("one at a time", options["baseline"], elapsed)
+        finally:
+            user.delete()
+
+    def payloads(self, party, prefix, bills, lines):
+        for i in range(bills):
+            yield {
+                "party_id": party.pk,
+                "billno": f"{prefix}-{i}",
+                "date": "2025-04-01",
+                "productdetails": [
+                    {
+                        "hsncode": 8471,
+                        "cgst": "9",
+                        "sgst": "9",
+                        "product_discription": f"Item {n}",
+                        "product_quantity": n + 1,
+                        "unit_type": "NOS",
+                        "unit_price": "125.50",
+                    }
+                    for n in range(lines)
+                ],
+            }
+
+    def report(self, label, bills, elapsed):
+        self.stdout.write(
+            f"{label:>14}: {bills} bills in {elapsed:.2f}s "
+            f"({bills / elapsed:.1f} bills/s)"
+        )
@@ -0,0 +1,275 @@
+import io
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import reportlab
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from PIL import Image
+
+from utils.pdf_generator import build_pdf, clear_template_cache
+
+SELLER = {
+    "id": 1,
+    "email": "seller@example.com",
+    "username": "seller",
+    "company_name": "Seller Traders",
+    "logo": None,
+    "logo_pdf": None,
+    "salogan": None,
+    "address": "12 Market Road",
+    "city": "Gurugram",
+    "gstin": "06ABCDE1234F1Z5",
+    "pan": "ABCDE1234F",
+    "pincode": "122001",
+    "mobile": "9999999999",
+    "state": "HARYANA",
+    "statecode": "6",
+    "bank_name": "Bank",
+    "bank_account": "000111222333",
+    "bank_ifsc": "BANK0000001",
+    "swift_code": None,
+}
+BUYER = {
+    "name": "Buyer Enterprises",
+    "address": "4 Ring Road",
+    "city": "Delhi",
+    "gstin": "07ABCDE1234F1Z5",
+    "state": "DELHI",
+    "statecode": "7",
+}
+LOGO_NAME = "bench-logo.png"
+
+
+def sample_document(doc_type, lines, logo=False):
+    """Synthetic ``build_pdf`` payload with ``lines`` line items."""
+    seller = {**SELLER, "logo": f"/media/{LOGO_NAME}" if logo else None}
+    products = [
+        {
+            "product_discription": f"Item {n}",
+            "hsncode": "8471",
+            "product_quantity": n % 7 + 1,
+            "unit_type": "pcs",
+            "unit_price": f"{125.35 + n:.2f}",
+            "cgst": 9 if doc_type == "invoice" else 0,
+            "sgst": 9 if doc_type == "invoice" else 0,
+            "igst": 0 if doc_type == "invoice" else 18,
+        }
+        for n in range(lines)
+    ]
+    data = {
+        "date": "2025-05-01",
+        "tc": "Payment due within 30 days.",
+        "party": {**BUYER, "user": seller},
+    }
+    if doc_type == "invoice":
+        data.update(
+            billno="INV/2025-26/0001", placeofsupply="Delhi", productdetails=products
+        )
+    else:
+        data.update(
+            quotationno="QTN/2025-26/0001", subject="Supply", quotationdetails=products
+        )
+    return data
+
+
+def run_case(case, repeat, cold, media_root, results):
+    """
+    Measure one case; runs in a forked child so peak RSS is its own.
+    Timed renders run untraced, then one more render runs under tracemalloc.
+    """
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    data = sample_document(case["doc_type"], case["lines"], case["logo"])
+    with override_settings(MEDIA_ROOT=media_root):
+        pages = build_pdf(data, io.BytesIO(), case["doc_type"])  # warm up
+        timings = []
+        for _ in range(repeat):
+            if cold:
+                clear_template_cache()
+            started = time.perf_counter()
+            build_pdf(data, io.BytesIO(), case["doc_type"])
+            timings.append(time.perf_counter() - started)
+
+        tracemalloc.start()
+        build_pdf(data, io.BytesIO(), case["doc_type"])
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    wall = statistics.median(timings)
+    results.put(
+        {
+            **case,
+            "pages": pages,
+            "wall_ms": round(wall * 1000, 3),
+            "min_ms": round(min(timings) * 1000, 3),
+            "pages_per_s": round(pages / wall, 2),
+            # ru_maxrss is in KiB on Linux
+            "peak_rss_mb": round(peak_rss / 1024, 1),
+            "rss_growth_mb": round((peak_rss - baseline_rss) / 1024, 1),
+            "tracemalloc_peak_mb": round(traced_peak / 2**20, 2),
+            "top_allocators": [
+                {
+                    "where": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_kb": round(stat.size / 1024, 1),
+                    "count": stat.count,
+                }
+                for stat in snapshot.statistics("lineno")[:5]
+            ],
+        }
+    )
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark PDF rendering on synthetic invoices and quotations: wall "
+        "time, pages/s, peak RSS and tracemalloc top allocators per payload "
+        "size, with and without a logo. Writes JSON with --output and checks "
+        "it against an earlier run with --compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lines", type=int, nargs="+", default=[1, 50, 500, 5000])
+        parser.add_argument("--doc-types", nargs="+", default=["invoice", "quotation"])
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Clear the style and seller block caches before every render.",
+        )
+        parser.add_argument("--output", help="Write the results as JSON here.")
+        parser.add_argument("--compare", help="JSON results of an earlier run.")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=1.10,
+            help="With --compare, fail when a case is this many times slower.",
+        )
+
+    def handle(self, *args, **options):
+        cases = [
+            {"doc_type": doc_type, "lines": lines, "logo": logo}
+            for doc_type in options["doc_types"]
+            for lines in options["lines"]
+            for logo in (False, True)
+        ]
+        results, failed = [], []
+        with tempfile.TemporaryDirectory() as media_root:
+            Image.new("RGB", (160, 120), (74, 144, 226)).save(
+                os.path.join(media_root, LOGO_NAME)
+            )
+            for case in cases:
+                result, exitcode = self.run_child(case, options, media_root)
+                if result is None:
+                    failed.append(case)
+                    self.stderr.write(
+                        f"{case['doc_type']:<9} {case['lines']:>5} lines "
+                        f"{'logo' if case['logo'] else 'no logo':<7} "
+                        f"failed with exit code {exitcode}"
+                    )
+                    continue
+                results.append(result)
+                self.stdout.write(
+                    f"{case['doc_type']:<9} {case['lines']:>5} lines "
+                    f"{'logo' if case['logo'] else 'no logo':<7} "
+                    f"{result['wall_ms']:10.2f} ms {result['pages']:>4} pages "
+                    f"{result['pages_per_s']:8.2f} pages/s "
+                    f"rss {result['peak_rss_mb']:7.1f} MB "
+                    f"traced {result['tracemalloc_peak_mb']:7.2f} MB"
+                )
+
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "created": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "reportlab": reportlab.Version,
+                "repeat": options["repeat"],
+                "cold": options["cold"],
+            },
+            "results": results,
+            "failed": failed,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as out:
+                json.dump(report, out, indent=2)
+        if options["compare"]:
+            self.compare(report, options["compare"], options["threshold"])
+        if failed:
+            raise CommandError(f"{len(failed)} cases failed: {failed}")
+
+    def run_child(self, case, options, media_root):
+        """
+        ``(result, exitcode)`` of ``run_case`` in a forked child; the result
+        is ``None`` if the child died before sending it.
+        """
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        child = context.Process(
+            target=run_case,
+            args=(case, options["repeat"], options["cold"], media_root, results),
+        )
+        child.start()
+        result = None
+        while result is None:
+            # checked before waiting so a result sent just before exit is read
+            alive = child.is_alive()
+            try:
+                result = results.get(timeout=1)
+            except queue.Empty:
+                if not alive:
+                    break
+        child.join()
+        return result, child.exitcode
+
+    def compare(self, report, path, threshold):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        def key(result):
+            return result["doc_type"], result["lines"], result["logo"]
+
+        before = {key(result): result for result in baseline["results"]}
+        regressions = []
+        self.stdout.write(f"\ncompared with {baseline['meta'].get('commit') or path}")
+        for result in report["results"]:
+            old = before.get(key(result))
+            if old is None:
+                continue
+            ratio = result["wall_ms"] / old["wall_ms"]
+            self.stdout.write(
+                f"{result['doc_type']:<9} {result['lines']:>5} lines "
+                f"{'logo' if result['logo'] else 'no logo':<7} "
+                f"{old['wall_ms']:10.2f} -> {result['wall_ms']:10.2f} ms "
+                f"({ratio:.2f}x)"
+            )
+            if ratio > threshold:
+                regressions.append(key(result))
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} cases are over {threshold:.2f}x slower: "
+                f"{regressions}"
+            )
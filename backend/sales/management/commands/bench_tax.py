@@ -0,0 +1,111 @@
+import timeit
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from sales.models import ProductDetail
+from sales.tax import compute_taxes
+
+
+class LegacyLine:
+    """The float properties line items exposed before ``sales.tax``."""
+
+    def __init__(self, line):
+        self.cgst, self.sgst, self.igst = line.cgst, line.sgst, line.igst
+        self.unit_price = line.unit_price
+        self.product_quantity = line.product_quantity
+
+    @property
+    def gst_rate(self):
+        return float(self.cgst + self.sgst + self.igst)
+
+    @property
+    def get_sgst_amount(self):
+        return round(
+            (float(self.sgst) * float(self.unit_price)) * self.product_quantity / 100, 2
+        )
+
+    @property
+    def get_cgst_amount(self):
+        return round(
+            (float(self.cgst) * float(self.unit_price)) * self.product_quantity / 100, 2
+        )
+
+    @property
+    def get_igst_amount(self):
+        return round(
+            (float(self.igst) * float(self.unit_price)) * self.product_quantity / 100, 2
+        )
+
+    @property
+    def single_item_total_gst(self):
+        return round(
+            (self.gst_rate * float(self.unit_price)) * self.product_quantity / 100, 2
+        )
+
+    @property
+    def single_item_total_amount_without_tax(self):
+        return round(float(self.unit_price) * self.product_quantity, 2)
+
+    @property
+    def single_item_total_amount_after_tax(self):
+        return round(
+            self.single_item_total_amount_without_tax + self.single_item_total_gst, 2
+        )
+
+
+PROPERTIES = [
+    "get_sgst_amount",
+    "get_cgst_amount",
+    "get_igst_amount",
+    "single_item_total_gst",
+    "gst_rate",
+    "single_item_total_amount_without_tax",
+    "single_item_total_amount_after_tax",
+]
+
+
+class Command(BaseCommand):
+    help = "Compare the per-row float properties with sales.tax.compute_taxes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        for size in options["sizes"]:
+            lines = [
+                ProductDetail(
+                    cgst=Decimal("9"),
+                    sgst=Decimal("9"),
+                    igst=Decimal("0"),
+                    product_quantity=n % 7 + 1,
+                    unit_price=Decimal("125.35") + n,
+                )
+                for n in range(size)
+            ]
+            number = max(1, 10000 // size)
+
+            legacy_lines = [LegacyLine(line) for line in lines]
+
+            def properties():
+                # one access per serialized field, as the serializer did
+                return [
+                    [getattr(line, name) for name in PROPERTIES]
+                    for line in legacy_lines
+                ]
+
+            def vectorized():
+                return compute_taxes(lines)
+
+            legacy = min(
+                timeit.repeat(properties, number=number, repeat=options["repeat"])
+            )
+            current = min(
+                timeit.repeat(vectorized, number=number, repeat=options["repeat"])
+            )
+            self.stdout.write(
+                f"{size:>6} lines: properties {legacy / number * 1000:8.3f} ms, "
+                f"compute_taxes {current / number * 1000:8.3f} ms "
+                f"({legacy / current:.2f}x)"
+            )
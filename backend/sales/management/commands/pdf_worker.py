@@ -0,0 +1,67 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from sales.models import PdfJob
+from utils.pdf_generator import render_pdf
+
+
+class Command(BaseCommand):
+    help = (
+        "Render queued PdfJobs in a process pool. Runs until interrupted, "
+        "or until the queue is empty with --once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument(
+            "--poll", type=float, default=1.0, help="Seconds between queue checks."
+        )
+        parser.add_argument("--once", action="store_true")
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=600,
+            help="Requeue jobs left running this many seconds by a dead worker.",
+        )
+
+    def handle(self, *args, **options):
+        stale = timezone.now() - timedelta(seconds=options["stale_after"])
+        requeued = PdfJob.objects.requeue_stale(stale)
+        if requeued:
+            self.stdout.write(f"requeued {requeued} stale jobs")
+
+        workers = options["workers"]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = {}
+            while True:
+                close_old_connections()
+                # keep every worker busy with one job queued behind it
+                free = 2 * workers - len(pending)
+                if free > 0:
+                    for job in PdfJob.objects.claim(free):
+                        future = pool.submit(render_pdf, job.payload, job.doc_type)
+                        pending[future] = job
+                if not pending:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll"])
+                    continue
+
+                done, _ = wait(
+                    pending, timeout=options["poll"], return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    job = pending.pop(future)
+                    try:
+                        job.finish(future.result())
+                    except Exception as exc:
+                        job.fail(f"{type(exc).__name__}: {exc}")
+                        self.stderr.write(f"job {job.pk} failed: {exc}")
+                    else:
+                        self.stdout.write(f"job {job.pk} done")
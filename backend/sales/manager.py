@@ -1,28 +1,223 @@
-from django.db import models
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from utils.common import get_financial_year
+
+
+def _money(expression):
+    return Round(
+        models.ExpressionWrapper(
+            expression,
+            output_field=models.DecimalField(max_digits=16, decimal_places=6),
+        ),
+        2,
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def _line_tax_amounts():
+    """Per-line tax amounts, rounded to paise, as expressions keyed by name."""
+    amount = models.F("unit_price") * models.F("product_quantity")
+    # Not "/ 100": SQLite truncates the division of whole-rupee amounts.
+    percent = models.Value(Decimal("0.01"), output_field=models.DecimalField())
+    gst_rate = models.F("cgst") + models.F("sgst") + models.F("igst")
+    return {
+        "cgst_amount": _money(amount * models.F("cgst") * percent),
+        "sgst_amount": _money(amount * models.F("sgst") * percent),
+        "igst_amount": _money(amount * models.F("igst") * percent),
+        "total_gst": _money(amount * gst_rate * percent),
+        "amount_without_tax": _money(amount),
+    }
+
+
+class LineItemQuerySet(models.QuerySet):
+
+    def with_tax(self):
+        """
+        Annotate every ``LineTax`` amount as ``tax_<name>`` so serializers
+        read them from the row instead of computing them in Python.
+        """
+        gst_rate = models.F("cgst") + models.F("sgst") + models.F("igst")
+        amounts = _line_tax_amounts()
+        return self.annotate(
+            tax_gst_rate=models.ExpressionWrapper(
+                gst_rate,
+                output_field=models.DecimalField(max_digits=9, decimal_places=2),
+            ),
+            **{f"tax_{name}": expression for name, expression in amounts.items()},
+        ).annotate(
+            tax_amount_after_tax=models.F("tax_amount_without_tax")
+            + models.F("tax_total_gst"),
+        )
+
+    def tax_summary(self, *fields):
+        """
+        One row per distinct ``fields`` with the summed quantity and the
+        sums of the lines' rounded tax amounts, from a single grouped query.
+        """
+        amounts = _line_tax_amounts()
+        return (
+            self.values(*fields)
+            .annotate(
+                quantity=models.Sum("product_quantity"),
+                taxable_value=models.Sum(amounts["amount_without_tax"]),
+                cgst_amount=models.Sum(amounts["cgst_amount"]),
+                sgst_amount=models.Sum(amounts["sgst_amount"]),
+                igst_amount=models.Sum(amounts["igst_amount"]),
+                total_gst=models.Sum(amounts["total_gst"]),
+            )
+            .order_by(*fields)
+        )
+
+
+class DocumentSequenceManager(models.Manager):
+
+    def allocate(self, user_id, doc_type, financial_year, count=1):
+        """
+        Reserve ``count`` consecutive numbers and return them as a range.
+
+        The counter is bumped with a single UPDATE, which locks the row until
+        the surrounding transaction ends: concurrent callers wait for it
+        instead of colliding and retrying. Call it inside the transaction
+        that saves the documents so a rollback hands the numbers back and
+        the sequence stays gap-free.
+        """
+        key = {
+            "user_id": user_id,
+            "doc_type": doc_type,
+            "financial_year": financial_year,
+        }
+        with transaction.atomic():
+            self.get_or_create(**key)
+            self.filter(**key).update(last_value=models.F("last_value") + count)
+            last_value = self.filter(**key).values_list("last_value", flat=True).get()
+        return range(last_value - count + 1, last_value + 1)
+
+    def assign_numbers(self, documents, doc_type, number_field):
+        """
+        Number every document in ``documents`` that has no number yet from
+        its owner's sequence for the document's financial year.
+        """
+        pending = defaultdict(list)
+        for document in documents:
+            if getattr(document, number_field):
+                continue
+            financial_year = get_financial_year(document.date or date.today())
+            pending[(document.party.user_id, financial_year)].append(document)
+
+        for (user_id, financial_year), group in pending.items():
+            numbers = self.allocate(user_id, doc_type, financial_year, len(group))
+            for document, sequence in zip(group, numbers):
+                document.financial_year = financial_year
+                document.sequence = sequence
+                setattr(
+                    document,
+                    number_field,
+                    self.model.format_number(doc_type, financial_year, sequence),
+                )
 
 
 class BillManager(models.Manager):
 
-    def get_unpaid_bill_amount(self, column_name, start_date, end_date):
-        queryset = self.filter(is_paid=False, date__gte=start_date, date__lte=end_date)
+    def create_from_quotations(self, quotations, billnos, **fields):
+        """
+        Create one bill per quotation.
+
+        Line items of all quotations are copied with a single SELECT and a
+        bulk INSERT, and the quotations' stored totals are carried over as
+        they are. ``billnos`` maps quotation pk to the new bill number,
+        ``fields`` are set on every bill. Quotations missing from
+        ``billnos`` get the next number of their owner's invoice sequence.
+        """
+        from analytics.models import MonthlySalesRollup
+
+        from .models import DocumentSequence, ProductDetail, QProductDetail
+
+        bills = {}
+        for quotation in quotations:
+            bill = self.model(
+                party=quotation.party,
+                user_id=quotation.user_id,
+                quotation=quotation,
+                billno=billnos.get(quotation.pk, ""),
+                dateofsupply=quotation.date,
+                tc=quotation.tc,
+                is_paid=False,
+            )
+            if quotation.date:
+                bill.date = quotation.date
+            for field in self.model.TOTAL_FIELDS:
+                setattr(bill, field, getattr(quotation, field))
+            for field, value in fields.items():
+                setattr(bill, field, value)
+            bills[quotation.pk] = bill
+
+        with transaction.atomic():
+            DocumentSequence.objects.assign_numbers(bills.values(), "invoice", "billno")
+            self.bulk_create(bills.values())
+            lines = QProductDetail.objects.filter(quotationno__in=list(bills)).values(
+                "quotationno_id", *ProductDetail.LINE_FIELDS
+            )
+            ProductDetail.objects.bulk_create(
+                (
+                    ProductDetail(billno=bills[line.pop("quotationno_id")], **line)
+                    for line in lines.iterator()
+                ),
+                batch_size=1000,
+            )
+            MonthlySalesRollup.objects.add_documents(list(bills.values()))
+
+        return list(bills.values())
+
+    def get_unpaid_bill_amount(self, column_name, period):
+        queryset = self.filter(is_paid=False, **period.filter())
         return queryset.aggregate(unpaid_bill_amount=models.Sum(column_name))[
             "unpaid_bill_amount"
         ]
 
-    def get_paid_bill_amount(self, column_name, start_date, end_date):
-        queryset = self.filter(is_paid=True, date__gte=start_date, date__lte=end_date)
+    def get_paid_bill_amount(self, column_name, period):
+        queryset = self.filter(is_paid=True, **period.filter())
         return queryset.aggregate(paid_bill_amount=models.Sum(column_name))[
             "paid_bill_amount"
         ]
 
-    def get_total_bill_amount_with_gst(self, start_date, end_date):
-        queryset = self.filter(is_paid=False, date__gte=start_date, date__lte=end_date)
+    def get_total_bill_amount_with_gst(self, period):
+        queryset = self.filter(is_paid=False, **period.filter())
         return queryset.aggregate(
             total_bill_amount_with_gst=models.Sum("total_amount_after_gst")
         )["total_bill_amount_with_gst"]
 
-    def get_total_bill_amount_without_gst(self, start_date, end_date):
-        queryset = self.filter(is_paid=False, date__gte=start_date, date__lte=end_date)
+    def get_total_bill_amount_without_gst(self, period):
+        queryset = self.filter(is_paid=False, **period.filter())
         return queryset.aggregate(
             total__bill_gst_amount=models.Sum("total_gst_amount")
         )["total__bill_gst_amount"]
+
+
+class PdfJobManager(models.Manager):
+
+    def claim(self, limit):
+        """
+        Mark up to ``limit`` pending jobs running and return them, oldest
+        first. Each job is taken with a conditional UPDATE, so concurrent
+        workers never claim the same one.
+        """
+        claimed = []
+        pending = self.filter(status="pending").order_by("id")
+        for pk in pending.values_list("pk", flat=True)[:limit]:
+            if self.filter(pk=pk, status="pending").update(
+                status="running", udate=timezone.now()
+            ):
+                claimed.append(pk)
+        return list(self.filter(pk__in=claimed).order_by("id"))
+
+    def requeue_stale(self, before):
+        """Return jobs left running since ``before`` by a dead worker to the queue."""
+        return self.filter(status="running", udate__lt=before).update(
+            status="pending", udate=timezone.now()
+        )
@@ -0,0 +1,105 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:43
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+
+def backfill_totals(apps, schema_editor):
+    """
+    Recompute every stored total from the line items, the way
+    ``sales.tax.compute_taxes`` does: each component is summed exactly and
+    rounded once, the GST and grand totals are the sums of rounded values.
+    """
+    cent = Decimal("0.01")
+    for model_name, related_name in (
+        ("BillDetail", "productdetails"),
+        ("QuotationDetail", "quotationdetails"),
+    ):
+        model = apps.get_model("sales", model_name)
+        documents = model.objects.prefetch_related(related_name)
+        for document in documents.iterator(chunk_size=500):
+            subtotal = cgst = sgst = igst = Decimal("0")
+            units = 0
+            for line in getattr(document, related_name).all():
+                amount = line.unit_price * line.product_quantity
+                subtotal += amount
+                cgst += amount * line.cgst / 100
+                sgst += amount * line.sgst / 100
+                igst += amount * line.igst / 100
+                units += line.product_quantity
+            document.subtotal_amount = subtotal.quantize(cent, ROUND_HALF_UP)
+            document.total_cgst_amount = cgst.quantize(cent, ROUND_HALF_UP)
+            document.total_sgst_amount = sgst.quantize(cent, ROUND_HALF_UP)
+            document.total_igst_amount = igst.quantize(cent, ROUND_HALF_UP)
+            document.total_gst_amount = (
+                document.total_cgst_amount
+                + document.total_sgst_amount
+                + document.total_igst_amount
+            )
+            document.total_amount_after_gst = (
+                document.subtotal_amount + document.total_gst_amount
+            )
+            document.total_units = str(units)
+            document.save(
+                update_fields=[
+                    "subtotal_amount",
+                    "total_cgst_amount",
+                    "total_sgst_amount",
+                    "total_igst_amount",
+                    "total_gst_amount",
+                    "total_amount_after_gst",
+                    "total_units",
+                ]
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billdetail',
+            name='subtotal_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='billdetail',
+            name='total_cgst_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='billdetail',
+            name='total_igst_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='billdetail',
+            name='total_sgst_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='quotationdetail',
+            name='subtotal_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='quotationdetail',
+            name='total_cgst_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='quotationdetail',
+            name='total_igst_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='quotationdetail',
+            name='total_sgst_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sales", "0002_stored_tax_totals"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="billdetail",
+            name="quotation",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="bills",
+                to="sales.quotationdetail",
+            ),
+        ),
+    ]
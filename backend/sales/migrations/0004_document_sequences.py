@@ -0,0 +1,105 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clients", "0002_initial"),
+        ("sales", "0003_billdetail_quotation"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentSequence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "doc_type",
+                    models.CharField(
+                        choices=[("invoice", "INV"), ("quotation", "QTN")],
+                        max_length=10,
+                    ),
+                ),
+                ("financial_year", models.PositiveSmallIntegerField()),
+                ("last_value", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "db_table": "document_sequences",
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="billdetail",
+            options={
+                "get_latest_by": ["financial_year", "sequence"],
+                "ordering": ("-date", "-billno"),
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="quotationdetail",
+            options={
+                "get_latest_by": ["financial_year", "sequence"],
+                "ordering": ("-quotationno",),
+            },
+        ),
+        migrations.AddField(
+            model_name="billdetail",
+            name="financial_year",
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="billdetail",
+            name="sequence",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="quotationdetail",
+            name="financial_year",
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="quotationdetail",
+            name="sequence",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="billdetail",
+            index=models.Index(
+                fields=["financial_year", "sequence"],
+                name="billdetails_financi_479124_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="quotationdetail",
+            index=models.Index(
+                fields=["financial_year", "sequence"],
+                name="quotaiondet_financi_701482_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="documentsequence",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="documentsequence",
+            constraint=models.UniqueConstraint(
+                fields=("user", "doc_type", "financial_year"),
+                name="unique_document_sequence",
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clients", "0003_client_user_name_index"),
+        ("sales", "0004_document_sequences"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="billdetail",
+            index=models.Index(
+                fields=["party", "date"], name="billdetails_party_i_e6309b_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="billdetail",
+            index=models.Index(
+                fields=["is_paid", "date"], name="billdetails_is_paid_335d1a_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="billdetail",
+            index=models.Index(fields=["date"], name="billdetails_date_f14e26_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="quotationdetail",
+            index=models.Index(
+                fields=["party", "date"], name="quotaiondet_party_i_2067f7_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="quotationdetail",
+            index=models.Index(fields=["date"], name="quotaiondet_date_cf9b21_idx"),
+        ),
+    ]
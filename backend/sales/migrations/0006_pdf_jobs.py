@@ -0,0 +1,80 @@
+# Generated by Django 6.1.2 on 2026-10-18 17:00
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sales", "0005_tenant_query_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PdfJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cdate", models.DateTimeField(auto_now_add=True)),
+                ("udate", models.DateTimeField(auto_now=True)),
+                (
+                    "doc_type",
+                    models.CharField(
+                        choices=[("invoice", "INV"), ("quotation", "QTN")],
+                        max_length=10,
+                    ),
+                ),
+                ("filename", models.CharField(max_length=100)),
+                (
+                    "payload",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "file",
+                    models.FileField(blank=True, null=True, upload_to="pdf_jobs/"),
+                ),
+                ("error", models.TextField(blank=True, default="")),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "pdf_jobs",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "id"], name="pdf_jobs_status_66636b_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,123 @@
+# Generated by Django 6.1.2 on 2026-10-18 17:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_party_user(apps, schema_editor):
+    Client = apps.get_model("clients", "Client")
+    owner = models.Subquery(
+        Client.objects.filter(pk=models.OuterRef("party")).values("user")[:1]
+    )
+    for model_name in ("BillDetail", "QuotationDetail"):
+        apps.get_model("sales", model_name).objects.update(user=owner)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clients", "0003_client_user_name_index"),
+        ("sales", "0006_pdf_jobs"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="billdetail",
+            options={
+                "get_latest_by": ["user", "financial_year", "sequence"],
+                "ordering": ("-date", "-billno"),
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="quotationdetail",
+            options={
+                "get_latest_by": ["user", "financial_year", "sequence"],
+                "ordering": ("-quotationno",),
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name="billdetail",
+            name="billdetails_financi_479124_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="quotationdetail",
+            name="quotaiondet_financi_701482_idx",
+        ),
+        migrations.AddField(
+            model_name="billdetail",
+            name="user",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="quotationdetail",
+            name="user",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(copy_party_user, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="billdetail",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="quotationdetail",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="billdetail",
+            name="billno",
+            field=models.CharField(max_length=150),
+        ),
+        migrations.AlterField(
+            model_name="quotationdetail",
+            name="quotationno",
+            field=models.CharField(max_length=150),
+        ),
+        migrations.AddIndex(
+            model_name="billdetail",
+            index=models.Index(
+                fields=["user", "financial_year", "sequence"],
+                name="billdetails_user_id_161440_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="quotationdetail",
+            index=models.Index(
+                fields=["user", "financial_year", "sequence"],
+                name="quotaiondet_user_id_e32b93_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="billdetail",
+            constraint=models.UniqueConstraint(
+                fields=("user", "billno"), name="unique_bill_number"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="quotationdetail",
+            constraint=models.UniqueConstraint(
+                fields=("user", "quotationno"), name="unique_quotation_number"
+            ),
+        ),
+    ]
@@ -1,10 +1,17 @@
+import re
 from datetime import datetime
-from decimal import Decimal
+from django.core.files.base import ContentFile
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 from clients.models import Client
-from .manager import BillManager
-from django.db.models import F, Sum, DecimalField, ExpressionWrapper
+from .manager import (
+    BillManager,
+    DocumentSequenceManager,
+    LineItemQuerySet,
+    PdfJobManager,
+)
+from .tax import annotated_line_tax, compute_taxes
 
 UNIT_TYPES = (
     ("BAG", "BAGS"),
@@ -54,6 +61,12 @@ UNIT_TYPES = (
 )
 
 
+DOCUMENT_TYPES = (
+    ("invoice", "INV"),
+    ("quotation", "QTN"),
+)
+
+
 class TimeStampModel(models.Model):
     class Meta:
         abstract = True
@@ -63,6 +76,18 @@ class TimeStampModel(models.Model):
 
 
 class BaseTransactionDetail(TimeStampModel):
+    subtotal_amount = models.DecimalField(
+        max_digits=9, decimal_places=2, null=True, blank=True
+    )
+    total_cgst_amount = models.DecimalField(
+        max_digits=9, decimal_places=2, null=True, blank=True
+    )
+    total_sgst_amount = models.DecimalField(
+        max_digits=9, decimal_places=2, null=True, blank=True
+    )
+    total_igst_amount = models.DecimalField(
+        max_digits=9, decimal_places=2, null=True, blank=True
+    )
     total_gst_amount = models.DecimalField(
         max_digits=9, decimal_places=2, null=True, blank=True
     )
@@ -70,41 +95,66 @@ class BaseTransactionDetail(TimeStampModel):
         max_digits=9, decimal_places=2, null=True, blank=True
     )
     total_units = models.CharField(max_length=30, null=True, blank=True)
+    # Copy of ``party.user``: document numbers are unique per account.
+    user = models.ForeignKey(
+        "users.Account", on_delete=models.CASCADE, related_name="+"
+    )
+    # Set when the number was allocated from DocumentSequence.
+    financial_year = models.PositiveSmallIntegerField(null=True, blank=True)
+    sequence = models.PositiveIntegerField(null=True, blank=True)
+
+    TOTAL_FIELDS = [
+        "subtotal_amount",
+        "total_cgst_amount",
+        "total_sgst_amount",
+        "total_igst_amount",
+        "total_gst_amount",
+        "total_amount_after_gst",
+        "total_units",
+    ]
 
     class Meta:
         abstract = True
 
-    def update_totals(self, related_name):
-        products = getattr(self, related_name)
-
-        # GST calculation: ( (cgst+sgst+igst)/100 * unit_price * quantity )
-        gst_expr = ExpressionWrapper(
-            (F("cgst") + F("sgst") + F("igst"))
-            * F("unit_price")
-            * F("product_quantity")
-            / 100.0,
-            output_field=DecimalField(max_digits=12, decimal_places=2),
-        )
-
-        # Base amount without tax
-        base_amount_expr = ExpressionWrapper(
-            F("unit_price") * F("product_quantity"),
-            output_field=DecimalField(max_digits=12, decimal_places=2),
-        )
-
-        aggregates = products.aggregate(
-            total_gst=Sum(gst_expr),
-            total_units=Sum("product_quantity"),
-            total_amount=Sum(base_amount_expr + gst_expr),
-        )
-
-        self.total_gst_amount = aggregates["total_gst"] or 0
-        self.total_units = str(aggregates["total_units"] or 0)
-        self.total_amount_after_gst = aggregates["total_amount"] or 0
-
-        self.save(
-            update_fields=["total_gst_amount", "total_amount_after_gst", "total_units"]
-        )
+    def save(self, *args, **kwargs):
+        if kwargs.get("update_fields") is None:
+            self.user_id = self.party.user_id
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stored values, so ``analytics`` can take edits out of the old month.
+        instance._loaded_values = {
+            name: value
+            for name, value in zip(field_names, values)
+            if value is not models.DEFERRED
+        }
+        return instance
+
+    def update_totals(self, related_name, lines=None):
+        """
+        Store the document totals computed from ``lines``.
+
+        Callers that just wrote the line items pass them in so no query is
+        needed; otherwise they are read from ``related_name``.
+        """
+        if lines is None:
+            lines = getattr(self, related_name).all()
+
+        self.compute_totals(lines)
+        self.save(update_fields=[*self.TOTAL_FIELDS, "udate"])
+
+    def compute_totals(self, lines):
+        """Set the total fields from ``lines`` without saving."""
+        tax = compute_taxes(lines)
+        self.subtotal_amount = tax.subtotal
+        self.total_cgst_amount = tax.cgst
+        self.total_sgst_amount = tax.sgst
+        self.total_igst_amount = tax.igst
+        self.total_gst_amount = tax.total_gst
+        self.total_amount_after_gst = tax.total_amount
+        self.total_units = str(tax.total_units)
 
 
 class BillDetail(BaseTransactionDetail):
@@ -112,7 +162,7 @@ class BillDetail(BaseTransactionDetail):
         "clients.Client", on_delete=models.CASCADE, related_name="client"
     )
     orderno = models.CharField(max_length=50, null=True, blank=True)
-    billno = models.CharField(max_length=150, unique=True)
+    billno = models.CharField(max_length=150)
     date = models.DateField(default=datetime.now)
     transportmode = models.CharField(max_length=10, null=True, blank=True)
     vehicleno = models.CharField(max_length=10, null=True, blank=True)
@@ -126,11 +176,18 @@ class BillDetail(BaseTransactionDetail):
         "Interest @24% will be charged if bills not paid at presentation. E.& O.E.",
     )
     is_paid = models.BooleanField(default=False)
+    quotation = models.ForeignKey(
+        "QuotationDetail",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="bills",
+    )
 
     objects = BillManager()
 
-    def update_totals(self):
-        super().update_totals("productdetails")
+    def update_totals(self, lines=None):
+        super().update_totals("productdetails", lines)
 
     def __str__(self):
         return f"{self.billno}-{self.party.name}"
@@ -138,12 +195,23 @@ class BillDetail(BaseTransactionDetail):
     class Meta:
         db_table = "billdetails"
         ordering = ("-date", "-billno")
-        get_latest_by = ["-billno"]
+        get_latest_by = ["user", "financial_year", "sequence"]
+        indexes = [
+            models.Index(fields=["user", "financial_year", "sequence"]),
+            models.Index(fields=["party", "date"]),
+            models.Index(fields=["is_paid", "date"]),
+            models.Index(fields=["date"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "billno"], name="unique_bill_number"
+            )
+        ]
 
 
 class QuotationDetail(BaseTransactionDetail):
     party = models.ForeignKey("clients.Client", on_delete=models.CASCADE)
-    quotationno = models.CharField(max_length=150, unique=True)
+    quotationno = models.CharField(max_length=150)
     date = models.DateField(null=True, blank=True)
     subject = models.CharField(max_length=200)
     tc = models.CharField(
@@ -153,8 +221,8 @@ class QuotationDetail(BaseTransactionDetail):
         "3. Quoted Rate validity is 30 Days from quotation date",
     )
 
-    def update_totals(self):
-        super().update_totals("quotationdetails")
+    def update_totals(self, lines=None):
+        super().update_totals("quotationdetails", lines)
 
     def __str__(self):
         return f"{self.quotationno}-{self.party.name}"
@@ -162,6 +230,98 @@ class QuotationDetail(BaseTransactionDetail):
     class Meta:
         db_table = "quotaiondetails"
         ordering = ("-quotationno",)
+        get_latest_by = ["user", "financial_year", "sequence"]
+        indexes = [
+            models.Index(fields=["user", "financial_year", "sequence"]),
+            models.Index(fields=["party", "date"]),
+            models.Index(fields=["date"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "quotationno"], name="unique_quotation_number"
+            )
+        ]
+
+
+class DocumentSequence(models.Model):
+    """Last number handed out per user, document type and financial year."""
+
+    user = models.ForeignKey("users.Account", on_delete=models.CASCADE)
+    doc_type = models.CharField(max_length=10, choices=DOCUMENT_TYPES)
+    financial_year = models.PositiveSmallIntegerField()
+    last_value = models.PositiveIntegerField(default=0)
+
+    objects = DocumentSequenceManager()
+
+    @staticmethod
+    def format_number(doc_type, financial_year, sequence):
+        """e.g. ``INV/2025-26/0001``"""
+        prefix = dict(DOCUMENT_TYPES)[doc_type]
+        return (
+            f"{prefix}/{financial_year}-{(financial_year + 1) % 100:02d}/{sequence:04d}"
+        )
+
+    @staticmethod
+    def is_sequence_number(doc_type, number):
+        """
+        Whether ``number`` has the form of ``format_number``. Such numbers
+        are only handed out by the sequence, a manual one would collide with
+        a later allocation.
+        """
+        prefix = re.escape(dict(DOCUMENT_TYPES)[doc_type])
+        return re.fullmatch(rf"{prefix}/\d{{4}}-\d{{2}}/\d{{4,}}", number) is not None
+
+    def __str__(self):
+        return f"{self.user_id}-{self.doc_type}-{self.financial_year}-{self.last_value}"
+
+    class Meta:
+        db_table = "document_sequences"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "doc_type", "financial_year"],
+                name="unique_document_sequence",
+            )
+        ]
+
+
+class PdfJob(TimeStampModel):
+    """A PDF render queued for ``manage.py pdf_worker``."""
+
+    PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+    STATUSES = (
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    user = models.ForeignKey("users.Account", on_delete=models.CASCADE)
+    doc_type = models.CharField(max_length=10, choices=DOCUMENT_TYPES)
+    filename = models.CharField(max_length=100)
+    # The data ``utils.pdf_generator.build_pdf`` renders.
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    file = models.FileField(upload_to="pdf_jobs/", null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    objects = PdfJobManager()
+
+    def finish(self, content):
+        self.file.save(f"{self.pk}-{self.filename}", ContentFile(content), save=False)
+        self.status = self.DONE
+        self.save(update_fields=["file", "status", "udate"])
+
+    def fail(self, error):
+        self.status = self.FAILED
+        self.error = error
+        self.save(update_fields=["status", "error", "udate"])
+
+    def __str__(self):
+        return f"{self.pk}-{self.doc_type}-{self.status}"
+
+    class Meta:
+        db_table = "pdf_jobs"
+        indexes = [models.Index(fields=["status", "id"])]
 
 
 class BaseProductDetail(TimeStampModel):
@@ -176,47 +336,33 @@ class BaseProductDetail(TimeStampModel):
     )
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
 
-    class Meta:
-        abstract = True
-
-    # --- Computed properties ---
-    @property
-    def gst_rate(self):
-        return float(self.cgst + self.sgst + self.igst)
-
-    @property
-    def get_sgst_amount(self):
-        return round(
-            (float(self.sgst) * float(self.unit_price)) * self.product_quantity / 100, 2
-        )
-
-    @property
-    def get_cgst_amount(self):
-        return round(
-            (float(self.cgst) * float(self.unit_price)) * self.product_quantity / 100, 2
-        )
-
-    @property
-    def get_igst_amount(self):
-        return round(
-            (float(self.igst) * float(self.unit_price)) * self.product_quantity / 100, 2
-        )
+    LINE_FIELDS = [
+        "hsncode",
+        "cgst",
+        "sgst",
+        "igst",
+        "product_discription",
+        "product_quantity",
+        "unit_type",
+        "unit_price",
+    ]
 
-    @property
-    def single_item_total_gst(self):
-        return round(
-            (self.gst_rate * float(self.unit_price)) * self.product_quantity / 100, 2
-        )
+    objects = LineItemQuerySet.as_manager()
 
-    @property
-    def single_item_total_amount_without_tax(self):
-        return round(float(self.unit_price) * self.product_quantity, 2)
+    class Meta:
+        abstract = True
 
     @property
-    def single_item_total_amount_after_tax(self):
-        return round(
-            self.single_item_total_amount_without_tax + self.single_item_total_gst, 2
-        )
+    def tax(self):
+        """
+        ``LineTax`` of this line. Serializers computing a whole document at
+        once attach it as ``_tax``; rows loaded through ``with_tax()`` carry
+        it as annotations; otherwise it is computed on the spot.
+        """
+        tax = getattr(self, "_tax", None) or annotated_line_tax(self)
+        if tax is None:
+            tax = compute_taxes([self]).lines[0]
+        return tax
 
 
 class ProductDetail(BaseProductDetail):
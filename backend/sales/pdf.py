@@ -0,0 +1,245 @@
+"""
+PDFs of stored invoices and quotations.
+
+Rendered files are cached under ``MEDIA_ROOT`` as ``<folder>/<pk>-<key>.pdf``
+where the key hashes the document's ``udate`` and the seller and buyer
+profiles, so any edit to them renders a new file on the next request.
+"""
+
+import atexit
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import content_disposition_header, parse_etags
+
+from clients.serializers import ClientSerializer
+from users.serializers import UserSerializer
+from utils.pdf_generator import (
+    build_merged_pdf,
+    build_pdf,
+    pdf_folder,
+    render_pdf,
+)
+
+
+def document_parties(document):
+    """Serialized seller (the account) and buyer (the client) of ``document``."""
+    seller = UserSerializer(document.party.user).data
+    buyer = ClientSerializer(document.party).data
+    return seller, buyer
+
+
+def cache_key(document, doc_type, seller, buyer):
+    payload = json.dumps(
+        [doc_type, document.pk, document.udate.isoformat(), seller, buyer],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def document_data(document, serializer_class, seller, buyer):
+    """The payload ``build_pdf`` expects, built from the stored document."""
+    prefetch_related_objects(
+        [document],
+        Prefetch(
+            serializer_class.related_name,
+            queryset=serializer_class.product_model.objects.with_tax(),
+        ),
+    )
+    data = dict(serializer_class(document).data)
+    data["party"] = {**buyer, "user": seller}
+    return data
+
+
+def pdf_filename(document, serializer_class):
+    number = getattr(document, serializer_class.number_field) or document.pk
+    return f"{number}.pdf".replace("/", "-")
+
+
+def open_document_pdf(document, serializer_class):
+    """
+    ``(key, file)``: cache key and binary file of the rendered PDF of
+    ``document``, rendering it on a cache miss. ``document`` must come with
+    ``party__user`` selected.
+    """
+    doc_type = serializer_class.doc_type
+    seller, buyer = document_parties(document)
+    key = cache_key(document, doc_type, seller, buyer)
+    save_dir = os.path.join(settings.MEDIA_ROOT, pdf_folder(doc_type))
+    path = os.path.join(save_dir, f"{document.pk}-{key[:32]}.pdf")
+    try:
+        return key, open(path, "rb")
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(save_dir, exist_ok=True)
+    data = document_data(document, serializer_class, seller, buyer)
+    # Render next to the target and rename it into place so readers never see
+    # a partial file; the open handle stays valid whatever happens to the path.
+    out = tempfile.NamedTemporaryFile(dir=save_dir, suffix=".tmp", delete=False)
+    try:
+        build_pdf(data, out, doc_type)
+        out.flush()
+        os.replace(out.name, path)
+    except BaseException:
+        out.close()
+        os.unlink(out.name)
+        raise
+    remove_stale_pdfs(save_dir, document.pk, keep=path)
+    out.seek(0)
+    return key, out
+
+
+def build_merged_document_pdf(documents, serializer_class, target):
+    """
+    Render ``documents`` into one PDF in ``target``, serializing each only
+    when the renderer reaches it. ``documents`` must come with
+    ``party__user`` selected. Returns the page count.
+    """
+    payloads = (
+        document_data(document, serializer_class, *document_parties(document))
+        for document in documents
+    )
+    return build_merged_pdf(payloads, target, serializer_class.doc_type)
+
+
+def remove_stale_pdfs(save_dir, pk, keep):
+    """Delete earlier renders of document ``pk``."""
+    for path in glob.glob(os.path.join(save_dir, f"{pk}-*.pdf")):
+        if path != keep:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+def not_modified(request, etag):
+    """Whether the client's ``If-None-Match`` already names ``etag``."""
+    etags = parse_etags(request.headers.get("If-None-Match", ""))
+    return f'"{etag}"' in etags or "*" in etags
+
+
+def pdf_response(request, content, filename):
+    """
+    Respond with in-memory PDF ``content``, tagged with a hash of it so
+    clients can revalidate with ``If-None-Match``.
+    """
+    etag = hashlib.sha256(content).hexdigest()[:32]
+    if not_modified(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type="application/pdf")
+        response["Content-Length"] = len(content)
+        response["Content-Disposition"] = content_disposition_header(False, filename)
+    response["ETag"] = f'"{etag}"'
+    return response
+
+
+_export_pool = None
+_export_pool_lock = threading.Lock()
+
+
+def export_pool():
+    """
+    Process pool for PDF exports, started on first use and shut down at exit.
+    It has ``PDF_EXPORT_WORKERS`` workers in each web process, started from a
+    fork server rather than forked from the threaded server process.
+    """
+    global _export_pool
+    with _export_pool_lock:
+        if _export_pool is None:
+            _export_pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_EXPORT_WORKERS,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        return _export_pool
+
+
+def discard_export_pool(pool):
+    """Drop broken ``pool`` so the next ``export_pool()`` starts a new one."""
+    global _export_pool
+    with _export_pool_lock:
+        if _export_pool is pool:
+            _export_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown_export_pool():
+    with _export_pool_lock:
+        if _export_pool is not None:
+            _export_pool.shutdown(cancel_futures=True)
+
+
+class ZipStream:
+    """Unseekable sink for ``zipfile`` whose output is drained chunk by chunk."""
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_pdf_zip(documents, serializer_class):
+    """
+    Yield a ZIP of the PDFs of ``documents`` chunk by chunk. Rendering runs in
+    ``export_pool`` with at most two documents per worker in flight and each
+    PDF is added as soon as it is done, so memory stays bounded however many
+    documents match. ``documents`` must come with ``party__user`` selected.
+    """
+    pool = export_pool()
+    max_in_flight = 2 * settings.PDF_EXPORT_WORKERS
+    stream = ZipStream()
+    archive = zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_STORED)
+    documents = iter(documents)
+    pending = {}
+    try:
+        while True:
+            for document in documents:
+                seller, buyer = document_parties(document)
+                data = document_data(document, serializer_class, seller, buyer)
+                future = pool.submit(render_pdf, data, serializer_class.doc_type)
+                pending[future] = pdf_filename(document, serializer_class)
+                if len(pending) >= max_in_flight:
+                    break
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                archive.writestr(pending.pop(future), future.result())
+            yield stream.pop()
+        archive.close()
+        yield stream.pop()
+    except BrokenProcessPool:
+        discard_export_pool(pool)
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
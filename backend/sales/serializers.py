@@ -1,24 +1,56 @@
 from rest_framework import serializers
-from django.db import transaction
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models, transaction
+from django.urls import reverse
+from django.utils import timezone
 from sales.models import QProductDetail, QuotationDetail
 from clients.serializers import ClientSerializer
-from sales.models import BillDetail, ProductDetail
+from sales.models import BillDetail, DocumentSequence, PdfJob, ProductDetail
+from sales.tax import annotated_line_tax, compute_taxes
 
 from clients.models import Client
 
 
+class LineItemListSerializer(serializers.ListSerializer):
+    """
+    Attaches the taxes of all lines before rendering them: taken from the
+    ``with_tax()`` annotations when the lines were loaded with them,
+    otherwise computed in one pass.
+    """
+
+    def to_representation(self, data):
+        lines = list(
+            data.all() if isinstance(data, models.manager.BaseManager) else data
+        )
+        if lines and annotated_line_tax(lines[0]) is not None:
+            taxes = [annotated_line_tax(line) for line in lines]
+        else:
+            taxes = compute_taxes(lines).lines
+        for line, tax in zip(lines, taxes):
+            line._tax = tax
+        return [self.child.to_representation(line) for line in lines]
+
+
 class BaseProductSerializer(serializers.ModelSerializer):
-    get_sgst_amount = serializers.ReadOnlyField()
-    get_cgst_amount = serializers.ReadOnlyField()
-    get_igst_amount = serializers.ReadOnlyField()
-    single_item_total_gst = serializers.ReadOnlyField()
-    get_gst_prctg = serializers.ReadOnlyField()
-    single_item_total_amount_without_tax = serializers.ReadOnlyField()
-    single_item_total_amount_after_tax = serializers.ReadOnlyField()
+    # Optional on write: lets clients point an edited line at the row it replaces.
+    id = serializers.IntegerField(required=False)
+    get_sgst_amount = serializers.ReadOnlyField(source="tax.sgst_amount")
+    get_cgst_amount = serializers.ReadOnlyField(source="tax.cgst_amount")
+    get_igst_amount = serializers.ReadOnlyField(source="tax.igst_amount")
+    single_item_total_gst = serializers.ReadOnlyField(source="tax.total_gst")
+    get_gst_prctg = serializers.ReadOnlyField(source="tax.gst_rate")
+    single_item_total_amount_without_tax = serializers.ReadOnlyField(
+        source="tax.amount_without_tax"
+    )
+    single_item_total_amount_after_tax = serializers.ReadOnlyField(
+        source="tax.amount_after_tax"
+    )
 
     class Meta:
         abstract = True
+        list_serializer_class = LineItemListSerializer
         fields = [
+            "id",
             "hsncode",
             "cgst",
             "sgst",
@@ -47,12 +79,78 @@ class QProductDetailSerializer(BaseProductSerializer):
         model = QProductDetail
 
 
-class BaseTransactionSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Lets GET requests pick the rendered fields: ``?fields=a,b`` keeps only
+    those, ``?omit=a,b`` drops them and ``?view=summary`` keeps
+    ``Meta.summary_fields``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None or request.method != "GET":
+            return
+        selected = self.selected_fields(request.query_params)
+        if selected is not None:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+    @classmethod
+    def selected_fields(cls, query_params):
+        """Field names requested by ``query_params``, ``None`` for all of them."""
+        view = query_params.get("view")
+        fields = query_params.get("fields")
+        omit = query_params.get("omit")
+        if view != "summary" and not fields and not omit:
+            return None
+
+        if view == "summary":
+            selected = list(cls.Meta.summary_fields)
+        elif fields:
+            selected = [name for name in fields.split(",") if name in cls.Meta.fields]
+        else:
+            selected = list(cls.Meta.fields)
+        omitted = set(omit.split(",")) if omit else set()
+        return [name for name in selected if name not in omitted]
+
+    @classmethod
+    def selected_columns(cls, selected):
+        """Model columns needed to render the ``selected`` fields."""
+        opts = cls.Meta.model._meta
+        columns = ["id"]
+        for name in selected:
+            field = cls._declared_fields.get(name)
+            source = (field.source if field is not None else None) or name
+            path = source.split(".")
+            try:
+                model_field = opts.get_field(path[0])
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete:
+                columns.append("__".join(path))
+        return columns
+
+
+class BaseTransactionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     party = ClientSerializer(read_only=True)
+    party_name = serializers.CharField(source="party.name", read_only=True)
     party_id = serializers.PrimaryKeyRelatedField(
         queryset=Client.objects.all(), source="party", write_only=True
     )
 
+    subtotal_amount = serializers.DecimalField(
+        max_digits=10, decimal_places=2, read_only=True
+    )
+    total_cgst_amount = serializers.DecimalField(
+        max_digits=10, decimal_places=2, read_only=True
+    )
+    total_sgst_amount = serializers.DecimalField(
+        max_digits=10, decimal_places=2, read_only=True
+    )
+    total_igst_amount = serializers.DecimalField(
+        max_digits=10, decimal_places=2, read_only=True
+    )
     total_gst_amount = serializers.DecimalField(
         max_digits=10, decimal_places=2, read_only=True
     )
@@ -61,6 +159,8 @@ class BaseTransactionSerializer(serializers.ModelSerializer):
     )
     total_units = serializers.CharField(read_only=True)
 
+    doc_type = None  # override in child
+    number_field = None  # override in child
     product_field = None  # override in child
     product_model = None  # override in child
     related_name = None  # override in child
@@ -69,37 +169,128 @@ class BaseTransactionSerializer(serializers.ModelSerializer):
     class Meta:
         abstract = True
 
+    def validate(self, attrs):
+        """
+        Document numbers are unique per account, see ``user`` on the model,
+        and numbers in the sequence's own format are left to the sequence.
+        """
+        attrs = super().validate(attrs)
+        number = attrs.get(self.number_field)
+        current = getattr(self.instance, self.number_field, None)
+        if (
+            number
+            and number != current
+            and DocumentSequence.is_sequence_number(self.doc_type, number)
+        ):
+            raise serializers.ValidationError(
+                {
+                    self.number_field: [
+                        "Numbers of this form are assigned automatically."
+                    ]
+                }
+            )
+        party = attrs.get("party") or getattr(self.instance, "party", None)
+        if number and party is not None:
+            taken = self.Meta.model.objects.filter(
+                user=party.user_id, **{self.number_field: number}
+            )
+            if self.instance is not None:
+                taken = taken.exclude(pk=self.instance.pk)
+            if taken.exists():
+                raise serializers.ValidationError(
+                    {self.number_field: ["This number is already used."]}
+                )
+        return attrs
+
     def create(self, validated_data):
         products_data = validated_data.pop(self.related_name, [])
         with transaction.atomic():
-            instance = self.Meta.model.objects.create(**validated_data)
-            self._create_or_update_products(instance, products_data)
+            instance = self.Meta.model(**validated_data)
+            DocumentSequence.objects.assign_numbers(
+                [instance], self.doc_type, self.number_field
+            )
+            instance.save()
+            lines = self._create_or_update_products(instance, products_data)
+            instance.update_totals(lines)
         return instance
 
     def update(self, instance, validated_data):
-        products_data = validated_data.pop(self.related_name, [])
+        # ``None`` means the lines were not sent at all and stay untouched,
+        # an empty list clears them.
+        products_data = validated_data.pop(self.related_name, None)
         with transaction.atomic():
             for attr, value in validated_data.items():
                 setattr(instance, attr, value)
             instance.save()
 
-            if products_data:
-                self.product_model.objects.filter(
+            if products_data is not None:
+                existing = self.product_model.objects.filter(
                     **{self.product_field: instance}
-                ).delete()
-                self._create_or_update_products(instance, products_data)
-
-        instance.refresh_from_db()
-        instance.update_totals()
+                ).order_by("pk")
+                lines = self._create_or_update_products(
+                    instance, products_data, existing
+                )
+                instance.update_totals(lines)
         return instance
 
-    def _create_or_update_products(self, instance, product_data):
-        for prd in products_data:
-            self.product_model.objects.create(**{self.product_field: instance}, **prd)
+    def _create_or_update_products(self, instance, products_data, existing=()):
+        """
+        Sync the line items of ``instance`` with ``products_data``.
+
+        Incoming lines carrying an ``id`` are matched to that row, the rest
+        reuse the remaining rows in order. Only changed rows are written and
+        the whole sync costs at most one INSERT, one UPDATE batch and one
+        DELETE regardless of the number of lines.
+        """
+        existing = {line.pk: line for line in existing}
+
+        matched, unmatched = [], []
+        for data in products_data:
+            data = dict(data)
+            line = existing.pop(data.pop("id", None), None)
+            if line is None:
+                unmatched.append(data)
+            else:
+                matched.append((line, data))
+
+        leftovers = list(existing.values())
+        to_create = []
+        for data in unmatched:
+            if leftovers:
+                matched.append((leftovers.pop(0), data))
+            else:
+                to_create.append(
+                    self.product_model(**{self.product_field: instance}, **data)
+                )
+
+        now = timezone.now()
+        to_update, changed_fields = [], set()
+        for line, data in matched:
+            changed = [f for f, value in data.items() if getattr(line, f) != value]
+            if changed:
+                for field in changed:
+                    setattr(line, field, data[field])
+                line.udate = now
+                changed_fields.update(changed)
+                to_update.append(line)
+
+        if leftovers:
+            self.product_model.objects.filter(
+                pk__in=[line.pk for line in leftovers]
+            ).delete()
+        if to_update:
+            self.product_model.objects.bulk_update(
+                to_update, [*sorted(changed_fields), "udate"]
+            )
+        if to_create:
+            self.product_model.objects.bulk_create(to_create)
+
+        return [line for line, _ in matched] + to_create
 
 
 class BillDetailSerializer(BaseTransactionSerializer):
     productdetails = ProductDetailSerializer(many=True, required=False)
+    quotation = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta(BaseTransactionSerializer.Meta):
         model = BillDetail
@@ -107,6 +298,7 @@ class BillDetailSerializer(BaseTransactionSerializer):
             "id",
             "party",
             "party_id",
+            "party_name",
             "orderno",
             "billno",
             "date",
@@ -117,12 +309,28 @@ class BillDetailSerializer(BaseTransactionSerializer):
             "gstrc",
             "tc",
             "is_paid",
+            "quotation",
+            "subtotal_amount",
+            "total_cgst_amount",
+            "total_sgst_amount",
+            "total_igst_amount",
             "total_gst_amount",
             "total_amount_after_gst",
             "total_units",
             "productdetails",
         ]
+        summary_fields = [
+            "id",
+            "billno",
+            "date",
+            "party_name",
+            "is_paid",
+            "total_amount_after_gst",
+        ]
+        extra_kwargs = {"billno": {"required": False}}
 
+    doc_type = "invoice"
+    number_field = "billno"
     product_field = "billno"
     product_model = ProductDetail
     related_name = "productdetails"
@@ -138,17 +346,111 @@ class QuotationDetailSerializer(BaseTransactionSerializer):
             "id",
             "party",
             "party_id",
+            "party_name",
             "quotationno",
             "date",
             "subject",
             "tc",
+            "subtotal_amount",
+            "total_cgst_amount",
+            "total_sgst_amount",
+            "total_igst_amount",
             "total_gst_amount",
             "total_amount_after_gst",
             "total_units",
             "quotationdetails",
         ]
+        summary_fields = [
+            "id",
+            "quotationno",
+            "date",
+            "party_name",
+            "total_amount_after_gst",
+        ]
+        extra_kwargs = {"quotationno": {"required": False}}
 
+    doc_type = "quotation"
+    number_field = "quotationno"
     product_field = "quotationno"
     product_model = QProductDetail
     related_name = "quotationdetails"
     nested_serializer = QProductDetailSerializer
+
+
+class QuotationConversionSerializer(serializers.ModelSerializer):
+    """
+    Options of a quotation to invoice conversion: bill fields set on every
+    created bill and ``billnos``, chosen bill numbers keyed by quotation pk.
+    """
+
+    billnos = serializers.DictField(
+        child=serializers.CharField(
+            max_length=BillDetail._meta.get_field("billno").max_length,
+            allow_blank=True,
+        ),
+        required=False,
+        default=dict,
+    )
+
+    class Meta:
+        model = BillDetail
+        fields = [
+            "transportmode",
+            "vehicleno",
+            "dateofsupply",
+            "placeofsupply",
+            "gstrc",
+            "billnos",
+        ]
+
+    def validate_billnos(self, value):
+        try:
+            billnos = {int(pk): billno for pk, billno in value.items() if billno}
+        except ValueError:
+            raise serializers.ValidationError("Keys must be quotation ids.")
+
+        numbers = list(billnos.values())
+        repeated = sorted({billno for billno in numbers if numbers.count(billno) > 1})
+        if repeated:
+            raise serializers.ValidationError(f"Repeated bill numbers: {repeated}")
+        reserved = sorted(
+            billno
+            for billno in numbers
+            if DocumentSequence.is_sequence_number("invoice", billno)
+        )
+        if reserved:
+            raise serializers.ValidationError(
+                f"Bill numbers of this form are assigned automatically: {reserved}"
+            )
+        taken = BillDetail.objects.filter(
+            user=self.context["request"].user, billno__in=numbers
+        ).values_list("billno", flat=True)
+        if taken:
+            raise serializers.ValidationError(
+                f"Bill numbers already used: {sorted(taken)}"
+            )
+        return billnos
+
+
+class PdfJobSerializer(serializers.ModelSerializer):
+    download = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PdfJob
+        fields = [
+            "id",
+            "doc_type",
+            "filename",
+            "status",
+            "error",
+            "cdate",
+            "udate",
+            "download",
+        ]
+
+    def get_download(self, obj):
+        if obj.status != PdfJob.DONE:
+            return None
+        url = reverse("pdf-job-download", args=[obj.pk])
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,130 @@
+"""
+GST computation for line items.
+
+``compute_taxes`` takes every line of a document at once, turns the inputs
+into columns of Decimals and computes all per-line and per-document amounts
+in a single pass. Per-line amounts are rounded to paise, document totals are
+summed from the exact amounts and rounded once, both with ROUND_HALF_UP.
+"""
+
+from collections import namedtuple
+from collections.abc import Mapping
+from decimal import Decimal, ROUND_HALF_UP
+
+CENT = Decimal("0.01")
+
+LineTax = namedtuple(
+    "LineTax",
+    [
+        "gst_rate",
+        "cgst_amount",
+        "sgst_amount",
+        "igst_amount",
+        "total_gst",
+        "amount_without_tax",
+        "amount_after_tax",
+    ],
+)
+
+DocumentTax = namedtuple(
+    "DocumentTax",
+    [
+        "lines",
+        "subtotal",
+        "cgst",
+        "sgst",
+        "igst",
+        "total_gst",
+        "total_amount",
+        "total_units",
+    ],
+)
+
+
+def annotated_line_tax(line):
+    """
+    ``LineTax`` built from ``LineItemQuerySet.with_tax()`` annotations, or
+    ``None`` when ``line`` was loaded without them.
+    """
+    if not hasattr(line, "tax_total_gst"):
+        return None
+    return LineTax._make(getattr(line, f"tax_{name}") for name in LineTax._fields)
+
+
+def _column(lines, name):
+    if lines and isinstance(lines[0], Mapping):
+        values = [line[name] for line in lines]
+    else:
+        values = [getattr(line, name) for line in lines]
+    return [
+        value if value.__class__ is Decimal else Decimal(str(value)) for value in values
+    ]
+
+
+def round_paise(value):
+    """``value`` rounded half up to paise, as every stored amount is."""
+    return value.quantize(CENT, ROUND_HALF_UP)
+
+
+def compute_taxes(lines):
+    """
+    Compute the tax breakdown of ``lines``.
+
+    ``lines`` may be model instances or dicts (e.g. serialized payloads)
+    with ``unit_price``, ``product_quantity``, ``cgst``, ``sgst`` and
+    ``igst``. Returns a ``DocumentTax`` whose ``lines`` are ``LineTax``
+    tuples in input order.
+    """
+    lines = list(lines)
+    prices = _column(lines, "unit_price")
+    quantities = _column(lines, "product_quantity")
+    cgst_rates = _column(lines, "cgst")
+    sgst_rates = _column(lines, "sgst")
+    igst_rates = _column(lines, "igst")
+
+    line_taxes = []
+    subtotal = cgst_total = sgst_total = igst_total = Decimal("0")
+    for price, quantity, cgst_rate, sgst_rate, igst_rate in zip(
+        prices, quantities, cgst_rates, sgst_rates, igst_rates
+    ):
+        amount = price * quantity
+        cgst = amount * cgst_rate / 100
+        sgst = amount * sgst_rate / 100
+        igst = amount * igst_rate / 100
+        gst_rate = cgst_rate + sgst_rate + igst_rate
+        subtotal += amount
+        cgst_total += cgst
+        sgst_total += sgst
+        igst_total += igst
+
+        total_gst = round_paise(amount * gst_rate / 100)
+        amount_without_tax = round_paise(amount)
+        line_taxes.append(
+            LineTax(
+                gst_rate,
+                round_paise(cgst),
+                round_paise(sgst),
+                round_paise(igst),
+                total_gst,
+                amount_without_tax,
+                amount_without_tax + total_gst,
+            )
+        )
+
+    subtotal = round_paise(subtotal)
+    cgst_total, sgst_total, igst_total = (
+        round_paise(cgst_total),
+        round_paise(sgst_total),
+        round_paise(igst_total),
+    )
+    total_gst = cgst_total + sgst_total + igst_total
+    return DocumentTax(
+        lines=line_taxes,
+        subtotal=subtotal,
+        cgst=cgst_total,
+        sgst=sgst_total,
+        igst=igst_total,
+        total_gst=total_gst,
+        total_amount=subtotal + total_gst,
+        total_units=int(sum(quantities)),
+    )
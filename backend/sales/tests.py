@@ -1,3 +1,722 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import zipfile
+from base64 import urlsafe_b64encode
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from clients.models import Client
+from sales.management.commands.bench_pdf import sample_document
+from sales.models import BillDetail, PdfJob, ProductDetail, QuotationDetail
+from sales.serializers import BillDetailSerializer
+from sales.tax import annotated_line_tax, compute_taxes
+from users.models import Account
+from utils import periods
+from utils.pdf_generator import (
+    PRODUCT_COL_WIDTHS,
+    PRODUCT_HEADER,
+    USABLE_WIDTH,
+    RunningTotalTable,
+    pdf_folder,
+    product_table_style,
+    render_pdf,
+)
+from utils.query_plans import QueryPlanTestCase
+
+
+def create_account(n):
+    user = Account.objects.create_user(
+        email=f"user{n}@example.com",
+        company_name=f"Company {n}",
+        gstin=f"GSTIN{n}",
+        pan=f"PAN{n}",
+    )
+    return user, Client.objects.create(user=user, name=f"Party {n}")
+
+
+def line(**fields):
+    return {
+        "product_discription": "Item",
+        "product_quantity": 2,
+        "unit_price": "10.00",
+        "cgst": "9",
+        "sgst": "9",
+        "igst": "0",
+        **fields,
+    }
+
+
+class SalesAPITestCase(APITestCase):
+    invoices = "/api/v1/sales/invoices/"
+    quotations = "/api/v1/sales/quotations/"
+
+    def setUp(self):
+        self.user, self.party = create_account(1)
+        self.other_user, self.other_party = create_account(2)
+        self.client.force_authenticate(self.user)
+
+    def as_other_user(self):
+        self.client.force_authenticate(self.other_user)
+
+    def create_invoice(self, party=None, **fields):
+        data = {
+            "party_id": (party or self.party).pk,
+            "date": "2025-05-01",
+            "productdetails": [line()],
+            **fields,
+        }
+        response = self.client.post(self.invoices, data, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+    def create_quotation(self, party=None, **fields):
+        data = {
+            "party_id": (party or self.party).pk,
+            "date": "2025-05-01",
+            "subject": "Quote",
+            "quotationdetails": [line()],
+            **fields,
+        }
+        response = self.client.post(self.quotations, data, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+
+class ComputeTaxesTests(SimpleTestCase):
+    def test_amounts_are_rounded_half_up(self):
+        tax = compute_taxes([line(unit_price="0.50", product_quantity=1)])
+
+        # 0.50 * 9% = 0.045
+        self.assertEqual(tax.lines[0].cgst_amount, Decimal("0.05"))
+        self.assertEqual(tax.lines[0].total_gst, Decimal("0.09"))
+        self.assertEqual(tax.cgst, Decimal("0.05"))
+
+    def test_document_totals_round_the_exact_sums(self):
+        # each line's 0.0045 CGST rounds to 0.00, their exact sum to 0.05
+        tax = compute_taxes([line(unit_price="0.05", product_quantity=1)] * 10)
+
+        self.assertEqual({item.cgst_amount for item in tax.lines}, {Decimal("0.00")})
+        self.assertEqual(tax.cgst, Decimal("0.05"))
+        self.assertEqual(tax.total_gst, tax.cgst + tax.sgst + tax.igst)
+        self.assertEqual(tax.total_amount, Decimal("0.60"))
+        self.assertEqual(tax.total_units, 10)
+
+    def test_float_and_string_inputs_are_exact(self):
+        tax = compute_taxes(
+            [{**line(), "unit_price": 0.1, "product_quantity": 3, "cgst": 2.5}]
+        )
+
+        self.assertEqual(tax.lines[0].amount_without_tax, Decimal("0.30"))
+        self.assertEqual(tax.subtotal, Decimal("0.30"))
+
+    def test_empty_document(self):
+        tax = compute_taxes([])
+
+        self.assertEqual(tax.lines, [])
+        self.assertEqual(tax.total_amount, Decimal("0.00"))
+
+
+class StoredTaxTests(SalesAPITestCase):
+    lines = [
+        line(unit_price="0.50", product_quantity=1),
+        line(unit_price="0.05", product_quantity=3, cgst="2.5", sgst="2.5"),
+        line(unit_price="1234.57", product_quantity=7, cgst="0", sgst="0", igst="28"),
+    ]
+
+    def test_stored_totals_match_compute_taxes(self):
+        bill = self.create_invoice(productdetails=self.lines)
+        tax = compute_taxes(self.lines)
+
+        self.assertEqual(Decimal(bill["subtotal_amount"]), tax.subtotal)
+        self.assertEqual(Decimal(bill["total_cgst_amount"]), tax.cgst)
+        self.assertEqual(Decimal(bill["total_igst_amount"]), tax.igst)
+        self.assertEqual(Decimal(bill["total_gst_amount"]), tax.total_gst)
+        self.assertEqual(Decimal(bill["total_amount_after_gst"]), tax.total_amount)
+
+    def test_database_line_amounts_match_compute_taxes(self):
+        bill = self.create_invoice(productdetails=self.lines)
+        stored = ProductDetail.objects.filter(billno=bill["id"]).order_by("pk")
+
+        self.assertEqual(
+            [annotated_line_tax(item) for item in stored.with_tax()],
+            compute_taxes(stored).lines,
+        )
+
+
+class LineItemSyncTests(SalesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.bill = self.create_invoice(productdetails=self.new_lines(3))
+        self.lines = self.bill["productdetails"]
+
+    def new_lines(self, count):
+        return [line(product_discription=f"Item {i}") for i in range(count)]
+
+    def sync(self, bill, lines):
+        response = self.client.patch(
+            f"{self.invoices}{bill['id']}/", {"productdetails": lines}, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def stored(self, bill):
+        return list(
+            ProductDetail.objects.filter(billno=bill["id"])
+            .order_by("pk")
+            .values_list("pk", "product_discription", "product_quantity")
+        )
+
+    def edited(self, bill):
+        """The lines of ``bill`` with the second one changed and one added."""
+        lines = [
+            {**line(product_discription=item["product_discription"]), "id": item["id"]}
+            for item in bill["productdetails"]
+        ]
+        lines[1]["product_quantity"] = 7
+        return [*lines, line(product_discription="Added")]
+
+    def test_lines_with_id_are_updated_in_place(self):
+        first, second, third = self.lines
+        bill = self.sync(
+            self.bill,
+            [
+                {**line(product_discription="Item 2"), "id": third["id"]},
+                {
+                    **line(product_discription="Item 0", product_quantity=5),
+                    "id": first["id"],
+                },
+                {**line(product_discription="Item 1"), "id": second["id"]},
+            ],
+        )
+
+        self.assertEqual(
+            self.stored(self.bill),
+            [
+                (first["id"], "Item 0", 5),
+                (second["id"], "Item 1", 2),
+                (third["id"], "Item 2", 2),
+            ],
+        )
+        self.assertEqual(bill["total_units"], "9")
+        self.assertEqual(bill["subtotal_amount"], "90.00")
+
+    def test_lines_without_id_reuse_leftover_rows(self):
+        pks = [pk for pk, _, _ in self.stored(self.bill)]
+        self.sync(self.bill, [line(product_discription="New")])
+
+        self.assertEqual(self.stored(self.bill), [(pks[0], "New", 2)])
+
+    def test_query_count_does_not_grow_with_the_lines(self):
+        large = self.create_invoice(productdetails=self.new_lines(30))
+
+        counts = []
+        for bill in (self.bill, large):
+            lines = self.edited(bill)
+            with CaptureQueriesContext(connection) as queries:
+                self.sync(bill, lines)
+            counts.append(len(queries))
+            self.assertEqual(len(self.stored(bill)), len(lines))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_omitted_lines_are_kept_and_an_empty_list_clears_them(self):
+        response = self.client.patch(
+            f"{self.invoices}{self.bill['id']}/", {"orderno": "PO-1"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.stored(self.bill)), 3)
+
+        bill = self.sync(self.bill, [])
+        self.assertEqual(self.stored(self.bill), [])
+        self.assertEqual(bill["total_amount_after_gst"], "0.00")
+
+
+class SparseFieldsTests(SalesAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.bill = self.create_invoice(tc="Terms")
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        sql = " ".join(query["sql"] for query in queries.captured_queries)
+        return response.data, sql
+
+    def test_summary_view_renders_and_loads_only_the_summary_fields(self):
+        data, sql = self.get(f"{self.invoices}?view=summary")
+
+        (row,) = data["results"]
+        self.assertEqual(set(row), set(BillDetailSerializer.Meta.summary_fields))
+        self.assertEqual(row["party_name"], self.party.name)
+        self.assertNotIn('"productdetails"', sql)
+        self.assertNotIn('"tc"', sql)
+
+    def test_fields_keeps_the_listed_fields(self):
+        data, sql = self.get(f"{self.invoices}?fields=billno,date,unknown")
+
+        self.assertEqual(list(data["results"][0]), ["billno", "date"])
+        # only() trims the columns to what the fields need
+        self.assertIn(
+            'SELECT "billdetails"."id", "billdetails"."billno", '
+            '"billdetails"."date" FROM',
+            sql,
+        )
+        self.assertNotIn('"productdetails"', sql)
+
+    def test_omit_drops_the_listed_fields(self):
+        data, sql = self.get(f"{self.invoices}{self.bill['id']}/?omit=productdetails")
+
+        self.assertNotIn("productdetails", data)
+        self.assertEqual(data["tc"], "Terms")
+        self.assertEqual(data["party"]["name"], self.party.name)
+        self.assertNotIn('"productdetails"', sql)
+
+    def test_full_representation_by_default(self):
+        data, _ = self.get(f"{self.invoices}{self.bill['id']}/")
+
+        self.assertEqual(set(data), set(self.bill))
+        self.assertEqual(len(data["productdetails"]), 1)
+
+    def test_selection_is_ignored_on_writes(self):
+        response = self.client.patch(
+            f"{self.invoices}{self.bill['id']}/?view=summary",
+            {"orderno": "PO-1"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("productdetails", response.data)
+
+
+class DocumentNumberingTests(SalesAPITestCase):
+    def test_each_account_numbers_its_own_invoices(self):
+        first = self.create_invoice()
+        self.as_other_user()
+        other = self.create_invoice(party=self.other_party)
+
+        self.assertEqual(first["billno"], "INV/2025-26/0001")
+        self.assertEqual(other["billno"], "INV/2025-26/0001")
+
+    def test_each_account_numbers_its_own_conversions(self):
+        self.create_invoice()
+        self.as_other_user()
+        quotation = self.create_quotation(party=self.other_party)
+
+        response = self.client.post(
+            f"{self.invoices}create-from-quotations/",
+            {"quotation_ids": [quotation["id"]]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data[0]["billno"], "INV/2025-26/0001")
+
+    def test_conversion_of_a_non_integer_id_is_rejected(self):
+        for quotation_id in ("abc", ["1"]):
+            response = self.client.post(
+                f"{self.invoices}create-from-quotation/",
+                {"quotation_id": quotation_id},
+                format="json",
+            )
+            self.assertEqual(response.status_code, 400, quotation_id)
+
+    def test_manual_numbers_are_unique_per_account(self):
+        self.create_invoice(billno="A-1")
+        response = self.client.post(
+            self.invoices,
+            {"party_id": self.party.pk, "billno": "A-1", "productdetails": [line()]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("billno", response.data)
+
+        self.as_other_user()
+        self.create_invoice(party=self.other_party, billno="A-1")
+
+    def test_manual_numbers_in_the_sequence_format_are_rejected(self):
+        response = self.client.post(
+            self.invoices,
+            {
+                "party_id": self.party.pk,
+                "billno": "INV/2025-26/0001",
+                "productdetails": [line()],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("billno", response.data)
+
+        bill = self.create_invoice()
+        self.assertEqual(bill["billno"], "INV/2025-26/0001")
+        # resending the assigned number on an update is fine
+        response = self.client.put(
+            f"{self.invoices}{bill['id']}/",
+            {"party_id": self.party.pk, "billno": bill["billno"], "orderno": "PO-1"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def test_conversion_numbers_in_the_sequence_format_are_rejected(self):
+        quotation = self.create_quotation()
+        response = self.client.post(
+            f"{self.invoices}create-from-quotations/",
+            {
+                "quotation_ids": [quotation["id"]],
+                "billnos": {str(quotation["id"]): "INV/2025-26/0001"},
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_latest_is_taken_per_account(self):
+        self.create_invoice()
+        self.create_invoice()
+        self.as_other_user()
+        self.create_invoice(party=self.other_party)
+
+        latest = BillDetail.objects.filter(user=self.user).latest()
+        self.assertEqual(latest.billno, "INV/2025-26/0002")
+
+
+class BulkImportTests(SalesAPITestCase):
+    def import_csv(self, content):
+        upload = SimpleUploadedFile("bills.csv", content, content_type="text/csv")
+        return self.client.post(f"{self.invoices}import/", {"file": upload})
+
+    def test_rows_without_number_are_separate_documents(self):
+        response = self.import_csv(
+            b"party_id,date,unit_price,product_quantity\n"
+            b"%d,2025-05-01,10,1\n"
+            b"%d,2025-05-02,20,2\n" % (self.party.pk, self.party.pk)
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 2, response.data)
+        self.assertEqual(
+            sorted(BillDetail.objects.values_list("billno", flat=True)),
+            ["INV/2025-26/0001", "INV/2025-26/0002"],
+        )
+
+    def test_document_column_groups_rows_without_number(self):
+        response = self.import_csv(
+            b"document,party_id,date,unit_price,product_quantity\n"
+            b"a,%d,2025-05-01,10,1\n"
+            b"a,%d,2025-05-01,20,2\n"
+            b"b,%d,2025-05-01,30,3\n" % ((self.party.pk,) * 3)
+        )
+
+        self.assertEqual(response.data["created"], 2, response.data)
+        self.assertEqual(
+            sorted(BillDetail.objects.values_list("total_units", flat=True)),
+            ["3", "3"],
+        )
+
+    def test_non_utf8_upload_is_rejected(self):
+        response = self.import_csv("party_id,billno\n1,Ä1\n".encode("latin-1"))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(BillDetail.objects.exists())
+
+
+class KeysetPaginationTests(SalesAPITestCase):
+    def page(self, url, **params):
+        return self.client.get(url, {"pagination": "cursor", **params})
+
+    def test_cursor_round_trip_visits_every_row_once(self):
+        for day in ["2025-05-01", "2025-05-01", "2025-05-03", None, "2025-04-20"]:
+            self.create_quotation(date=day)
+
+        response = self.page(self.quotations, limit=2)
+        seen = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen += [
+                (row["date"], row["quotationno"]) for row in response.data["results"]
+            ]
+            if response.data["next"] is None:
+                break
+            response = self.client.get(response.data["next"])
+
+        dated = sorted((row for row in seen if row[0]), reverse=True)
+        self.assertEqual(seen, dated + [row for row in seen if row[0] is None])
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_tampered_cursor_is_not_found(self):
+        for cursor in (["foo", "x", 1], [{"a": 1}, "x", 1], ["2025-05-01", "x"]):
+            encoded = urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+            response = self.page(self.invoices, cursor=encoded)
+            self.assertEqual(response.status_code, 404, cursor)
+        self.assertEqual(self.page(self.invoices, cursor="!!").status_code, 404)
+
+    def test_ordering_is_rejected(self):
+        response = self.page(self.invoices, ordering="billno")
+        self.assertEqual(response.status_code, 400)
+
+
+class PdfTestCase(SalesAPITestCase):
+    """Renders PDFs into a temporary ``MEDIA_ROOT``."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = media_root.name
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def cached_pdfs(self):
+        folder = os.path.join(self.media_root, pdf_folder("invoice"))
+        return sorted(os.listdir(folder)) if os.path.isdir(folder) else []
+
+
+class PdfTests(PdfTestCase):
+    def get_pdf(self, bill, **headers):
+        response = self.client.get(f"{self.invoices}{bill['id']}/pdf/", **headers)
+        if response.status_code == 200:
+            content = b"".join(response.streaming_content)
+            response.close()
+            self.assertTrue(content.startswith(b"%PDF"))
+        return response
+
+    def test_document_pdf_is_cached_until_the_document_changes(self):
+        bill = self.create_invoice()
+
+        first = self.get_pdf(bill)
+        (cached,) = self.cached_pdfs()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(
+            first["Content-Disposition"],
+            'inline; filename="INV-2025-26-0001.pdf"',
+        )
+        self.assertTrue(cached.startswith(f"{bill['id']}-"))
+
+        second = self.get_pdf(bill)
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(self.cached_pdfs(), [cached])
+
+        response = self.client.patch(
+            f"{self.invoices}{bill['id']}/", {"orderno": "PO-1"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        edited = self.get_pdf(bill)
+        self.assertNotEqual(edited["ETag"], first["ETag"])
+        self.assertNotEqual(self.cached_pdfs(), [cached])
+        self.assertEqual(len(self.cached_pdfs()), 1)
+
+    def test_matching_etag_is_not_modified(self):
+        bill = self.create_invoice()
+        etag = self.get_pdf(bill)["ETag"]
+
+        response = self.get_pdf(bill, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_document_pdf_of_another_account_is_not_found(self):
+        bill = self.create_invoice()
+        self.as_other_user()
+
+        self.assertEqual(self.get_pdf(bill).status_code, 404)
+
+    def test_posted_payload_with_list_values_renders(self):
+        data = sample_document("invoice", 3)
+        data["party"]["user"]["permissions"] = ["sales.add_billdetail"]
+
+        response = self.client.post(
+            f"{self.invoices}pdf/?stream=true", data, format="json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content.startswith(b"%PDF"))
+
+
+class MergedPdfTests(PdfTestCase):
+    def get_merged(self, query=""):
+        response = self.client.get(f"{self.invoices}merged/{query}")
+        content = b""
+        if response.status_code == 200:
+            content = b"".join(response.streaming_content)
+            response.close()
+        return response, content
+
+    def test_matching_documents_are_printed_into_one_pdf(self):
+        self.create_invoice()
+        self.create_invoice(date="2025-06-01")
+
+        response, content = self.get_merged()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertTrue(content.startswith(b"%PDF"))
+        self.assertEqual(response["X-Page-Count"], "2")
+        self.assertGreaterEqual(float(response["X-Render-Time"]), 0)
+
+        response, _ = self.get_merged("?date_after=2025-06-01")
+        self.assertEqual(response["X-Page-Count"], "1")
+
+    def test_no_matching_documents_is_not_found(self):
+        self.create_invoice()
+
+        response, _ = self.get_merged("?date_after=2026-01-01")
+        self.assertEqual(response.status_code, 404)
+
+        self.as_other_user()
+        response, _ = self.get_merged()
+        self.assertEqual(response.status_code, 404)
+
+
+class ExportPdfTests(SalesAPITestCase):
+    def get_export(self, query=""):
+        response = self.client.get(f"{self.invoices}export/{query}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        content = b"".join(response.streaming_content)
+        return zipfile.ZipFile(io.BytesIO(content))
+
+    def test_zip_holds_a_pdf_per_matching_document(self):
+        self.create_invoice()
+        self.create_invoice(date="2025-06-01")
+        self.as_other_user()
+        self.create_invoice(party=self.other_party)
+        self.client.force_authenticate(self.user)
+
+        archive = self.get_export()
+
+        self.assertEqual(
+            sorted(archive.namelist()),
+            ["INV-2025-26-0001.pdf", "INV-2025-26-0002.pdf"],
+        )
+        for name in archive.namelist():
+            self.assertTrue(archive.read(name).startswith(b"%PDF"))
+
+        archive = self.get_export("?date_before=2025-05-31")
+        self.assertEqual(archive.namelist(), ["INV-2025-26-0001.pdf"])
+
+    def test_no_matching_documents_is_an_empty_zip(self):
+        self.assertEqual(self.get_export().namelist(), [])
+
+
+class PdfJobTests(PdfTestCase):
+    pdf_jobs = "/api/v1/sales/pdf-jobs/"
+
+    def test_queued_job_is_claimed_once_and_downloaded_when_done(self):
+        bill = self.create_invoice()
+
+        response = self.client.post(f"{self.invoices}{bill['id']}/pdf-job/")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], PdfJob.PENDING)
+        self.assertIsNone(response.data["download"])
+        url = f"{self.pdf_jobs}{response.data['id']}/"
+        self.assertEqual(self.client.get(f"{url}download/").status_code, 409)
+
+        (job,) = PdfJob.objects.claim(5)
+        self.assertEqual(job.status, PdfJob.RUNNING)
+        self.assertEqual(PdfJob.objects.claim(5), [])
+        job.finish(render_pdf(job.payload, doc_type=job.doc_type))
+
+        data = self.client.get(url).data
+        self.assertEqual(data["status"], PdfJob.DONE)
+        self.assertTrue(data["download"].endswith(f"{url}download/"))
+        response = self.client.get(f"{url}download/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+        response.close()
+
+    def test_streamed_render_can_persist_a_job(self):
+        data = sample_document("invoice", 1)
+
+        response = self.client.post(
+            f"{self.invoices}pdf/?stream=true&persist=true", data, format="json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        job = PdfJob.objects.get(pk=response["X-Pdf-Job"])
+        self.assertEqual((job.user, job.status), (self.user, PdfJob.PENDING))
+
+    def test_stale_running_jobs_are_requeued(self):
+        self.client.post(f"{self.invoices}pdf/?job=true", {}, format="json")
+        PdfJob.objects.claim(1)
+
+        self.assertEqual(PdfJob.objects.requeue_stale(timezone.now()), 1)
+        self.assertEqual(PdfJob.objects.get().status, PdfJob.PENDING)
+
+    def test_jobs_of_another_account_are_hidden(self):
+        bill = self.create_invoice()
+        job_id = self.client.post(f"{self.invoices}{bill['id']}/pdf-job/").data["id"]
+        self.as_other_user()
+
+        self.assertEqual(self.client.get(self.pdf_jobs).data["results"], [])
+        response = self.client.get(f"{self.pdf_jobs}{job_id}/download/")
+        self.assertEqual(response.status_code, 404)
+
+
+class RunningTotalTableTests(SimpleTestCase):
+    def test_parts_fill_the_page_and_carry_the_total(self):
+        rows = [[f"Item {n}", *[""] * 7, "1.00"] for n in range(100)]
+        table = RunningTotalTable(
+            PRODUCT_HEADER,
+            rows,
+            [Decimal("1.00")] * len(rows),
+            PRODUCT_COL_WIDTHS,
+            product_table_style("invoice"),
+        )
+
+        first, rest = table.split(USABLE_WIDTH, 400)
+
+        placed = len(rows) - len(rest.rows)
+        self.assertLessEqual(first.wrap(USABLE_WIDTH, 400)[1], 400)
+        self.assertGreater(table.part(placed + 1).wrap(USABLE_WIDTH, 400)[1], 400)
+        self.assertEqual(rest.brought, placed)
+        self.assertEqual(rest.rows[0][0], f"Item {placed}")
+
+
+class SalesQueryPlanTests(QueryPlanTestCase):
+    endpoints = [
+        "/api/v1/sales/invoices/",
+        "/api/v1/sales/invoices/?view=summary",
+        "/api/v1/sales/invoices/?pagination=cursor",
+        "/api/v1/sales/invoices/?party=Party&date_after=2024-06-01&min_amount=100",
+        "/api/v1/sales/invoices/?ordering=-total_amount_after_gst",
+        "/api/v1/sales/invoices/{bill}/",
+        "/api/v1/sales/invoices/{bill}/dashboard/?party_name=Party 1",
+        "/api/v1/sales/quotations/",
+        "/api/v1/sales/quotations/?view=summary",
+        "/api/v1/sales/quotations/?pagination=cursor",
+        "/api/v1/sales/quotations/?party=Party&date_before=2025-01-01",
+        "/api/v1/sales/quotations/{quotation}/",
+        "/api/v1/sales/quotations/dashboard/?party_name=Party 1",
+    ]
+
+    def test_endpoints_use_indexes(self):
+        ids = {
+            "bill": BillDetail.objects.filter(user=self.user).first().pk,
+            "quotation": QuotationDetail.objects.filter(user=self.user).first().pk,
+        }
+        for url in self.endpoints:
+            with self.subTest(url=url):
+                self.assertEndpointUsesIndexes(url.format(**ids))
+
+    def test_tenant_querysets_use_indexes(self):
+        period = periods.financial_year(2024)
+        bills = BillDetail.objects.filter(party__user=self.user)
+        self.assertUsesIndexes(bills.filter(**period.filter()).order_by("-date"))
+        self.assertUsesIndexes(bills.filter(is_paid=False, **period.filter()))
+        self.assertUsesIndexes(
+            BillDetail.objects.filter(user=self.user, financial_year=2024).order_by(
+                "-sequence"
+            )
+        )
+        self.assertUsesIndexes(
+            ProductDetail.objects.filter(
+                billno__party__user=self.user, **period.filter("billno__date")
+            ).tax_summary("hsncode", "unit_type")
+        )
@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from sales.views import QuotationViewSet, BillDetailViewSet
+from sales.views import QuotationViewSet, BillDetailViewSet, PdfJobViewSet
 
 router = DefaultRouter()
 router.register(r"quotations", QuotationViewSet, basename="quotation")
 router.register(r"invoices", BillDetailViewSet, basename="invoices")
+router.register(r"pdf-jobs", PdfJobViewSet, basename="pdf-job")
 
 urlpatterns = [
     path("", include(router.urls)),
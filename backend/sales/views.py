@@ -1,25 +1,46 @@
-from django.db import transaction
-from django.db.models import F, ExpressionWrapper, DecimalField, Sum, Value
-from rest_framework import viewsets
+import itertools
+import os
+import tempfile
+import time
+
+from django.db.models import F, ExpressionWrapper, DecimalField, Prefetch, Sum, Value
+from rest_framework import status, viewsets
+from django.http import FileResponse, HttpResponseNotModified, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.http import content_disposition_header
 
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
 
 from .models import QuotationDetail, QProductDetail
-from .models import BillDetail, ProductDetail
+from .models import BillDetail, PdfJob, ProductDetail
 from clients.models import Client
 
 from .serializers import (
+    PdfJobSerializer,
+    QuotationConversionSerializer,
     QuotationDetailSerializer,
     QProductDetailSerializer,
 )
 from sales.serializers import BillDetailSerializer, ProductDetailSerializer
 from sales.filters import BillFilter, QuotationFilter
-from utils.pdf_generator import generate_pdf
+from backend.pagination import KeysetPaginationMixin
+from sales.importers import import_documents, is_utf8, read_csv, read_jsonl
+from sales.pdf import (
+    build_merged_document_pdf,
+    document_data,
+    document_parties,
+    not_modified,
+    open_document_pdf,
+    pdf_filename,
+    pdf_response,
+    stream_pdf_zip,
+)
+from utils.pdf_generator import generate_pdf, render_pdf
 
 
 class BaseDashboardMixin:
@@ -35,35 +56,221 @@ class BaseDashboardMixin:
         return totals
 
 
-class QuotationViewSet(BaseDashboardMixin, viewsets.ModelViewSet):
+class TransactionQuerysetMixin:
+    """
+    The user's documents, loading only what the requested fields need: line
+    items are skipped unless rendered and ``only()`` limits the columns when
+    the request selects fields (see ``SparseFieldsMixin``).
+    """
+
+    def get_queryset(self):
+        serializer_class = self.get_serializer_class()
+        related_name = serializer_class.related_name
+        queryset = serializer_class.Meta.model.objects.filter(
+            party__user=self.request.user
+        )
+
+        selected = None
+        if self.request.method == "GET":
+            selected = serializer_class.selected_fields(self.request.query_params)
+
+        if selected is None or related_name in selected:
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    related_name,
+                    queryset=serializer_class.product_model.objects.with_tax(),
+                )
+            )
+        if selected is None or "party" in selected:
+            return queryset.select_related("party")
+
+        columns = serializer_class.selected_columns(selected)
+        if "party_name" in selected:
+            queryset = queryset.select_related("party")
+        return queryset.only(*columns)
+
+
+class DocumentPdfMixin:
+    """
+    PDF rendering: ``pdf_from_payload`` backs the ``pdf`` POST actions,
+    ``download_pdf`` serves a stored document, ``submit_pdf_job`` queues it
+    for ``manage.py pdf_worker``, ``merged_pdf`` prints many of them into one
+    file and ``export_pdfs`` zips them.
+    """
+
+    def pdf_from_payload(self, request, filename, doc_type):
+        """
+        Render the posted document. With ``?stream=true`` the PDF is built in
+        memory and returned directly (``&persist=true`` also queues a
+        ``PdfJob`` storing a copy, named in ``X-Pdf-Job``), with ``?job=true``
+        it is only queued, otherwise it is saved and its path returned.
+        """
+        if request.query_params.get("job") == "true":
+            return self.queue_pdf_job(request, request.data, filename, doc_type)
+        if request.query_params.get("stream") != "true":
+            pdf_path = generate_pdf(request.data, filename, doc_type=doc_type)
+            return Response({"msg": f"Your {doc_type} PDF is saved at {pdf_path}"})
+
+        content = render_pdf(request.data, doc_type=doc_type)
+        response = pdf_response(request, content, filename)
+        if request.query_params.get("persist") == "true":
+            job = self.create_pdf_job(request, request.data, filename, doc_type)
+            response["X-Pdf-Job"] = job.pk
+        return response
+
+    def create_pdf_job(self, request, payload, filename, doc_type):
+        return PdfJob.objects.create(
+            user=request.user, doc_type=doc_type, filename=filename, payload=payload
+        )
+
+    def queue_pdf_job(self, request, payload, filename, doc_type):
+        job = self.create_pdf_job(request, payload, filename, doc_type)
+        serializer = PdfJobSerializer(job, context={"request": request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    def get_pdf_document(self, serializer_class, pk):
+        return get_object_or_404(
+            serializer_class.Meta.model.objects.select_related("party__user"),
+            pk=pk,
+            party__user=self.request.user,
+        )
+
+    @action(detail=True, methods=["get"], url_path="pdf", url_name="document-pdf")
+    def download_pdf(self, request, pk=None):
+        serializer_class = self.get_serializer_class()
+        document = self.get_pdf_document(serializer_class, pk)
+        key, pdf_file = open_document_pdf(document, serializer_class)
+        etag = key[:32]
+        if not_modified(request, etag):
+            pdf_file.close()
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(
+                pdf_file,
+                content_type="application/pdf",
+                filename=pdf_filename(document, serializer_class),
+            )
+        response["ETag"] = f'"{etag}"'
+        return response
+
+    @action(detail=True, methods=["post"], url_path="pdf-job", url_name="pdf-job")
+    def submit_pdf_job(self, request, pk=None):
+        serializer_class = self.get_serializer_class()
+        document = self.get_pdf_document(serializer_class, pk)
+        seller, buyer = document_parties(document)
+        payload = document_data(document, serializer_class, seller, buyer)
+        filename = pdf_filename(document, serializer_class)
+        return self.queue_pdf_job(request, payload, filename, serializer_class.doc_type)
+
+    @action(detail=False, methods=["get"], url_path="merged", url_name="merged")
+    def merged_pdf(self, request):
+        """
+        One printable PDF of every document matching the list filters, with
+        the page count and render seconds in ``X-Page-Count`` and
+        ``X-Render-Time``.
+        """
+        serializer_class = self.get_serializer_class()
+        queryset = self.filter_queryset(self.get_queryset())
+        documents = queryset.select_related("party__user").iterator(chunk_size=100)
+        first = next(documents, None)
+        if first is None:
+            return Response(
+                {"error": "No documents match."}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        documents = itertools.chain([first], documents)
+        pdf_file = tempfile.TemporaryFile()
+        started = time.perf_counter()
+        pages = build_merged_document_pdf(documents, serializer_class, pdf_file)
+        render_time = time.perf_counter() - started
+        pdf_file.seek(0)
+
+        response = FileResponse(
+            pdf_file,
+            content_type="application/pdf",
+            filename=f"{serializer_class.doc_type}s.pdf",
+        )
+        response["X-Page-Count"] = pages
+        response["X-Render-Time"] = f"{render_time:.3f}"
+        return response
+
+    @action(detail=False, methods=["get"], url_path="export", url_name="export")
+    def export_pdfs(self, request):
+        """ZIP of the PDFs of every document matching the list filters."""
+        serializer_class = self.get_serializer_class()
+        queryset = self.filter_queryset(self.get_queryset())
+        documents = queryset.select_related("party__user").iterator(chunk_size=100)
+        response = StreamingHttpResponse(
+            stream_pdf_zip(documents, serializer_class),
+            content_type="application/zip",
+        )
+        response["Content-Disposition"] = content_disposition_header(
+            True, f"{serializer_class.doc_type}s.zip"
+        )
+        return response
+
+
+class BulkImportMixin:
+    """Bulk import of documents from a JSON-lines or CSV upload."""
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        url_name="import",
+        parser_classes=[MultiPartParser],
+    )
+    def bulk_import(self, request):
+        """
+        Expects a UTF-8 multipart ``file`` (``.jsonl``/``.ndjson`` or
+        ``.csv``, see ``read_csv`` for the columns). The format can be forced
+        with a ``format`` field.
+        """
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "file is required"}, status=400)
+        if not is_utf8(upload):
+            return Response({"error": "file must be UTF-8 encoded"}, status=400)
+
+        serializer_class = self.get_serializer_class()
+        file_format = request.data.get("format") or (
+            os.path.splitext(upload.name)[1].lstrip(".").lower()
+        )
+        if file_format in ("jsonl", "ndjson"):
+            rows = read_jsonl(upload)
+        elif file_format == "csv":
+            rows = read_csv(
+                upload,
+                serializer_class.number_field,
+                serializer_class.related_name,
+                serializer_class.product_model.LINE_FIELDS,
+            )
+        else:
+            return Response({"error": "Unsupported file format."}, status=400)
+
+        result = import_documents(rows, serializer_class, self.get_serializer_context())
+        return Response(result)
+
+
+class QuotationViewSet(
+    BaseDashboardMixin,
+    KeysetPaginationMixin,
+    TransactionQuerysetMixin,
+    BulkImportMixin,
+    DocumentPdfMixin,
+    viewsets.ModelViewSet,
+):
     serializer_class = QuotationDetailSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_class = QuotationFilter
     ordering_fields = ["date", "total_amount_after_gst", "quotationno"]
     ordering = ["-date"]
-
-    def get_queryset(self):
-        return QuotationDetail.objects.filter(
-            party__user=self.request.user
-        ).prefetch_related("quotationdetails")
-
-    def perform_create(self, serializer):
-        with transaction.atomic():
-            quotation = serializer.save()
-            quotation.update_totals()
-            return quotation
-
-    def perform_update(self, serializer):
-        with transaction.atomic():
-            quotation = serializer.save()
-            quotation.update_totals()
-            return quotation
+    keyset_fields = ["date", "quotationno", "id"]
 
     @action(detail=False, methods=["post"], url_name="pdf")
     def pdf(self, request):
-        pdf_path = generate_pdf(request.data, "quotation.pdf", doc_type="quotation")
-        return Response({"msg": f"Your quotation PDF is saved at {pdf_path}"})
+        return self.pdf_from_payload(request, "quotation.pdf", "quotation")
 
     @action(detail=False, methods=["get"], url_name="dashboard")
     def dashboard(self, request):
@@ -112,30 +319,21 @@ class QuotationViewSet(BaseDashboardMixin, viewsets.ModelViewSet):
         )
 
 
-class BillDetailViewSet(BaseDashboardMixin, viewsets.ModelViewSet):
+class BillDetailViewSet(
+    BaseDashboardMixin,
+    KeysetPaginationMixin,
+    TransactionQuerysetMixin,
+    BulkImportMixin,
+    DocumentPdfMixin,
+    viewsets.ModelViewSet,
+):
     serializer_class = BillDetailSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_class = BillFilter
     ordering_fields = ["date", "total_amount_after_gst", "billno"]
     ordering = ["-date"]
-
-    def get_queryset(self):
-        return BillDetail.objects.filter(
-            party__user=self.request.user
-        ).prefetch_related("productdetails")
-
-    def perform_create(self, serializer):
-        with transaction.atomic():
-            bill = serializer.save()
-            bill.update_totals()
-            return bill
-
-    def perform_update(self, serializer):
-        with transaction.atomic():
-            bill = serializer.save()
-            bill.update_totals()
-            return bill
+    keyset_fields = ["date", "billno", "id"]
 
     @action(detail=True, methods=["get"], url_name="dashboard")
     def dashboard(self, request, pk=None):
@@ -182,8 +380,16 @@ class BillDetailViewSet(BaseDashboardMixin, viewsets.ModelViewSet):
 
     @action(detail=False, methods=["post"], url_name="pdf")
     def pdf(self, request):
-        pdf_path = generate_pdf(request.data, "invoice.pdf", doc_type="invoice")
-        return Response({"msg": f"Your invoice PDF is saved at {pdf_path}"})
+        return self.pdf_from_payload(request, "invoice.pdf", "invoice")
+
+    # Bill fields a conversion request may set on the created bills.
+    conversion_fields = [
+        "transportmode",
+        "vehicleno",
+        "dateofsupply",
+        "placeofsupply",
+        "gstrc",
+    ]
 
     @action(
         detail=False,
@@ -194,45 +400,107 @@ class BillDetailViewSet(BaseDashboardMixin, viewsets.ModelViewSet):
     def create_from_quotation(self, request):
         """
         Create a Bill (Invoice) by copying an existing Quotation.
-        Expects: { "quotation_id": <id> }
+        Expects: { "quotation_id": <id> }, optionally "billno"
         """
         quotation_id = request.data.get("quotation_id")
         if not quotation_id:
             return Response({"error": "quotation_id is required"}, status=400)
+        try:
+            quotation_id = int(quotation_id)
+        except (TypeError, ValueError):
+            return Response({"error": "quotation_id must be an integer"}, status=400)
 
-        quotation = get_object_or_404(QuotationDetail, id=quotation_id)
-
-        with transaction.atomic():
-            # Create bill from quotation
-            bill_data = {
-                "party": quotation.party,
-                "date": quotation.date,
-                "transportmode": request.data.get("transportmode", ""),
-                "vehicleno": request.data.get("vehicleno", ""),
-                "dateofsupply": request.data.get("dateofsupply", quotation.date),
-                "placeofsupply": request.data.get("placeofsupply", ""),
-                "gstrc": request.data.get("gstrc", ""),
-                "tc": quotation.tc,
-                "is_paid": False,
-            }
-            bill = BillDetail.objects.create(**bill_data)
-
-            # Copy products
-            for qprd in quotation.quotationdetails.all():
-                ProductDetail.objects.create(
-                    billno=bill,
-                    hsncode=qprd.hsncode,
-                    cgst=qprd.cgst,
-                    sgst=qprd.sgst,
-                    igst=qprd.igst,
-                    product_discription=qprd.product_discription,
-                    product_quantity=qprd.product_quantity,
-                    unit_type=qprd.unit_type,
-                    unit_price=qprd.unit_price,
-                )
+        billnos, fields = self._conversion_options(
+            request, {str(quotation_id): request.data.get("billno") or ""}
+        )
+        quotation = get_object_or_404(
+            QuotationDetail.objects.select_related("party"),
+            id=quotation_id,
+            party__user=request.user,
+        )
+        bill = BillDetail.objects.create_from_quotations(
+            [quotation], billnos, **fields
+        )[0]
 
-            bill.refresh_from_db()
-            bill.update_totals()
+        serializer = self.get_serializer(self.get_queryset().get(pk=bill.pk))
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        serializer = self.get_serializer(bill)
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="create-from-quotations",
+        url_name="create-from-quotations",
+    )
+    def create_from_quotations(self, request):
+        """
+        Create one Bill per Quotation in a single request.
+        Expects: { "quotation_ids": [<id>, ...] }, optionally
+        "billnos": {"<id>": <billno>}; other bills get the next free number.
+        """
+        quotation_ids = request.data.get("quotation_ids")
+        if not quotation_ids or not isinstance(quotation_ids, list):
+            return Response({"error": "quotation_ids is required"}, status=400)
+        try:
+            quotation_ids = list(dict.fromkeys(int(pk) for pk in quotation_ids))
+        except (TypeError, ValueError):
+            return Response({"error": "quotation_ids must be integers"}, status=400)
+
+        billnos, fields = self._conversion_options(
+            request, request.data.get("billnos") or {}
+        )
+        quotations = {
+            quotation.pk: quotation
+            for quotation in QuotationDetail.objects.filter(
+                id__in=quotation_ids, party__user=request.user
+            ).select_related("party")
+        }
+        missing = [pk for pk in quotation_ids if pk not in quotations]
+        if missing:
+            return Response({"error": f"Quotations not found: {missing}"}, status=404)
+
+        bills = BillDetail.objects.create_from_quotations(
+            [quotations[pk] for pk in quotation_ids], billnos, **fields
+        )
+
+        queryset = self.get_queryset().filter(pk__in=[bill.pk for bill in bills])
+        serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def _conversion_options(self, request, billnos):
+        """
+        Validated ``(billnos, fields)`` of a conversion request; blank bill
+        fields are left out. Raises a 400 ``ValidationError`` otherwise.
+        """
+        data = {
+            field: request.data[field]
+            for field in self.conversion_fields
+            if request.data.get(field) not in (None, "")
+        }
+        serializer = QuotationConversionSerializer(
+            data={**data, "billnos": billnos}, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        fields = dict(serializer.validated_data)
+        return fields.pop("billnos"), fields
+
+
+class PdfJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status and download of the user's queued PDF renders."""
+
+    serializer_class = PdfJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return PdfJob.objects.filter(user=self.request.user).order_by("-id")
+
+    @action(detail=True, methods=["get"], url_name="download")
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != PdfJob.DONE:
+            return Response(
+                {"status": job.status, "error": job.error},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return FileResponse(
+            job.file.open("rb"), content_type="application/pdf", filename=job.filename
+        )
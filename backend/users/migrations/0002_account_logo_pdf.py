@@ -0,0 +1,20 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="account",
+            name="logo_pdf",
+            field=models.ImageField(
+                blank=True, editable=False, null=True, upload_to="logos/pdf/"
+            ),
+        ),
+    ]
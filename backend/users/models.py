@@ -5,6 +5,8 @@ from django.contrib.auth.models import (
 )
 from django.db import models
 
+from utils.images import make_pdf_logo
+
 GST_STATE_CODE = (
     ("1", "JAMMU AND KASHMIR"),
     ("2", "HIMACHAL PRADESH"),
@@ -108,6 +110,10 @@ class Account(AbstractBaseUser, PermissionsMixin):
     username = models.CharField(max_length=70, unique=True)
     company_name = models.CharField(max_length=50)
     logo = models.ImageField(null=True, blank=True)
+    # Small copy of ``logo`` for PDFs, rebuilt whenever the logo changes.
+    logo_pdf = models.ImageField(
+        upload_to="logos/pdf/", null=True, blank=True, editable=False
+    )
     salogan = models.CharField(max_length=100, null=True, blank=True)
     address = models.CharField(max_length=200)
     city = models.CharField(max_length=50)
@@ -131,6 +137,28 @@ class Account(AbstractBaseUser, PermissionsMixin):
 
     objects = MyAccountManager()
 
+    # Logo name as loaded from the database, to detect new uploads.
+    _loaded_logo = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "logo" in field_names:
+            instance._loaded_logo = instance.logo.name or None
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "logo" in update_fields:
+            logo = self.logo.name or None
+            uploaded = logo and not self.logo._committed
+            if uploaded or logo != self._loaded_logo or (logo and not self.logo_pdf):
+                self.logo_pdf = make_pdf_logo(self.logo) if logo else None
+                if update_fields is not None:
+                    kwargs["update_fields"] = [*update_fields, "logo_pdf"]
+        super().save(*args, **kwargs)
+        self._loaded_logo = self.logo.name or None
+
     def has_perm(self, perm, obj=None):
         return self.is_superuser
 
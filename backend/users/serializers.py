@@ -47,6 +47,7 @@ class UserSerializer(serializers.ModelSerializer):
             "username",
             "company_name",
             "logo",
+            "logo_pdf",
             "salogan",
             "address",
             "city",
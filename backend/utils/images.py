@@ -0,0 +1,28 @@
+import os
+
+from django.core.files.base import ContentFile
+from PIL import Image
+
+# Logos are drawn at 40x30 points; 4x that keeps them sharp in print.
+PDF_LOGO_SIZE = (160, 120)
+
+
+def make_pdf_logo(image_file):
+    """
+    Downscaled PNG copy of an uploaded logo for the PDF renderer, which would
+    otherwise decode the full-size upload to draw a 40x30 point image.
+    ``None`` when the logo cannot be read; the renderer then uses the original.
+    """
+    try:
+        image_file.seek(0)
+        with Image.open(image_file) as image:
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+            image.thumbnail(PDF_LOGO_SIZE)
+            content = ContentFile(b"")
+            image.save(content, format="PNG", optimize=True)
+    except OSError:
+        return None
+    image_file.seek(0)
+    stem = os.path.splitext(os.path.basename(image_file.name))[0]
+    content.name = f"{stem}.png"
+    return content
@@ -1,29 +1,89 @@
+import copy
+import io
+import logging
 import os
+from collections import namedtuple
+from functools import lru_cache
+
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import (
+    Flowable,
     SimpleDocTemplate,
     Table,
     TableStyle,
     Paragraph,
     Spacer,
-    Image,
+    PageBreak,
 )
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
+from reportlab.lib.utils import ImageReader
+from urllib.parse import urlparse
 from django.conf import settings
 
+from sales.tax import compute_taxes
+
+logger = logging.getLogger(__name__)
+
+PAGE_WIDTH = 595
+MARGIN = 30
+USABLE_WIDTH = PAGE_WIDTH - 2 * MARGIN
+LOGO_WIDTH, LOGO_HEIGHT = 40, 30
+COMPANY_WIDTH = 0.55 * USABLE_WIDTH
+HEADER_WIDTH = USABLE_WIDTH - LOGO_WIDTH - COMPANY_WIDTH
+
+PRODUCT_HEADER = [
+    "Description",
+    "HSN",
+    "Qty",
+    "Unit",
+    "Unit Price",
+    "CGST%",
+    "SGST%",
+    "IGST%",
+    "Total",
+]
+PRODUCT_COL_WIDTHS = [120, 50, 40, 50, 60, 50, 50, 50, 80]
+
+HEADER_TABLE_STYLE = TableStyle(
+    [
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 0),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+        ("TOPPADDING", (0, 0), (-1, -1), 0),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
+    ]
+)
+SUMMARY_TABLE_STYLE = TableStyle(
+    [
+        ("ALIGN", (0, 0), (-1, -1), "RIGHT"),
+        ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
+        ("LINEABOVE", (0, 0), (-1, 0), 0.5, colors.black),
+        ("LINEABOVE", (0, -1), (-1, -1), 1, colors.black),
+    ]
+)
 
-def generate_pdf(data, filename="document.pdf", doc_type="invoice"):
-    elements = []
-    page_width = 595
-    margin = 30
-    usable_width = page_width - 2 * margin
+# Flowables that only depend on the seller's profile, and the profile fields
+# they use.
+SELLER_FIELDS = [
+    "company_name",
+    "address",
+    "city",
+    "gstin",
+    "pan",
+    "state",
+    "statecode",
+    "mobile",
+]
+BANK_FIELDS = ["bank_name", "bank_account", "bank_ifsc", "swift_code"]
+SellerBlocks = namedtuple(
+    "SellerBlocks", ["company", "bank_label", "bank", "signature", "signatory"]
+)
 
-    logo_width, logo_height = 40, 30
-    company_width = 0.55 * usable_width
-    header_width = usable_width - logo_width - company_width
 
-    # --- Styles ---
+@lru_cache(maxsize=None)
+def get_styles():
+    """The stylesheet shared by every document, built once per process."""
     styles = getSampleStyleSheet()
     styles.add(
         ParagraphStyle(
@@ -42,30 +102,30 @@ def generate_pdf(data, filename="document.pdf", doc_type="invoice"):
     styles.add(
         ParagraphStyle(name="RightAlign", fontSize=10, alignment=2, spaceBefore=40)
     )
+    return styles
 
-    # --- Save Path ---
-    folder = "invoices" if doc_type == "invoice" else "quotations"
-    save_dir = os.path.join(settings.MEDIA_ROOT, folder)
-    os.makedirs(save_dir, exist_ok=True)
-    full_path = os.path.join(save_dir, filename)
-
-    # --- Seller & Buyer ---
-    seller = data["party"]["user"]
-    buyer = data["party"]
-    # --- Document Title ---
-    elements.append(Paragraph(doc_type.upper(), styles["Heading"]))
-
-    # --- Top-left Logo & Company Info Table ---
-    logo_element = None
-    logo_path = seller.get("logo")
 
-    if logo_path:
-        logo_full_path = os.path.join(settings.MEDIA_ROOT, logo_path.split("/")[-1])
+@lru_cache(maxsize=None)
+def product_table_style(doc_type):
+    header_color = (
+        colors.HexColor("#4A90E2")
+        if doc_type == "invoice"
+        else colors.HexColor("#7B68EE")
+    )
+    return TableStyle(
+        [
+            ("BACKGROUND", (0, 0), (-1, 0), header_color),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+        ]
+    )
 
-        if os.path.exists(logo_full_path):
-            logo_element = Image(logo_full_path, width=logo_width, height=logo_height)
 
-    # Company info text
+@lru_cache(maxsize=256)
+def _seller_blocks(profile):
+    seller = dict(profile)
+    styles = get_styles()
     company_info = f"""
         <b>{seller['company_name']}</b><br/>
         {seller['address']}, {seller['city']}<br/>
@@ -73,7 +133,309 @@ def generate_pdf(data, filename="document.pdf", doc_type="invoice"):
         State: {seller['state']} ({seller['statecode']})<br/>
         Mobile: {seller['mobile'] or '-'}
     """
-    company_paragraph = Paragraph(company_info, styles["Normal"])
+    bank_info = (
+        f"Bank: {seller.get('bank_name','')} | "
+        f"A/c: {seller.get('bank_account','')} | "
+        f"IFSC: {seller.get('bank_ifsc','')} | "
+        f"SWIFT: {seller.get('swift_code','')}"
+    )
+    return SellerBlocks(
+        company=Paragraph(company_info, styles["Normal"]),
+        bank_label=Paragraph("<b>Bank Details:</b>", styles["Bold"]),
+        bank=Paragraph(bank_info, styles["Normal"]),
+        signature=Paragraph("For " + seller["company_name"], styles["RightAlign"]),
+        signatory=Paragraph("Authorized Signatory", styles["RightAlign"]),
+    )
+
+
+def seller_blocks(seller):
+    """
+    Seller flowables, parsed once per profile: the cache is keyed by the
+    profile fields they use so an edited profile builds fresh blocks. Each
+    call gets copies since layout stores per-document state on the flowable.
+    """
+    profile = [(field, seller[field]) for field in SELLER_FIELDS]
+    profile += [(field, seller.get(field, "")) for field in BANK_FIELDS]
+    blocks = _seller_blocks(tuple(profile))
+    return SellerBlocks(*(copy.copy(block) for block in blocks))
+
+
+@lru_cache(maxsize=64)
+def _image_reader(path, mtime_ns):
+    reader = ImageReader(path)
+    reader.getRGBData()  # decode now; the reader keeps the pixels
+    return reader
+
+
+class LogoImage(Flowable):
+    """
+    ``reader``, a decoded ``ImageReader``, drawn at a fixed size. Unlike
+    ``Image``, which opens its own reader, it shares the cached one.
+    """
+
+    def __init__(self, reader, width, height):
+        super().__init__()
+        self.reader = reader
+        self.width = width
+        self.height = height
+
+    def wrap(self, avail_width, avail_height):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.width, self.height, mask="auto")
+
+
+def media_path(url):
+    """
+    Local path of a serialized media file URL, ``None`` if it points outside
+    ``MEDIA_ROOT``. URLs not under ``MEDIA_URL`` resolve by file name only.
+    """
+    path = urlparse(url).path
+    if path.startswith(settings.MEDIA_URL):
+        path = path[len(settings.MEDIA_URL) :]
+    else:
+        path = path.split("/")[-1]
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    full_path = os.path.realpath(os.path.join(media_root, path))
+    if not full_path.startswith(media_root + os.sep):
+        return None
+    return full_path
+
+
+def logo_image(seller):
+    """
+    Logo flowable of ``seller``, preferring the small ``logo_pdf`` copy. The
+    decoded image is cached by path and mtime, so a replaced file is re-read.
+    """
+    url = seller.get("logo_pdf") or seller.get("logo")
+    path = media_path(url) if url else None
+    if path is None:
+        return None
+    try:
+        reader = _image_reader(path, os.stat(path).st_mtime_ns)
+    except OSError:
+        return None
+    return LogoImage(reader, LOGO_WIDTH, LOGO_HEIGHT)
+
+
+class RunningTotalTable(Flowable):
+    """
+    ``rows`` as a table that splits itself at the end of each page. Every
+    part repeats ``header``; the total of ``amounts`` (one per row) is
+    carried forward in the last column at the foot of a page and brought
+    forward at the top of the next one.
+
+    Splitting one huge ``Table`` re-measures every remaining row at each
+    page break, which is quadratic. A part is measured only over the rows
+    that can fit on a page, so rendering stays linear in the row count.
+    """
+
+    def __init__(self, header, rows, amounts, col_widths, style, brought=None):
+        super().__init__()
+        self.header = header
+        self.rows = rows
+        self.amounts = amounts
+        self.col_widths = col_widths
+        self.style = style
+        self.brought = brought
+        self.hAlign = "CENTER"
+        self.table = None
+
+    def total_row(self, label, amount):
+        return [label] + [""] * (len(self.header) - 2) + [f"{amount:.2f}"]
+
+    def part(self, count):
+        """Table of the first ``count`` rows, carrying forward if any remain."""
+        data = [self.header]
+        total_rows = []
+        running = self.brought or 0
+        if self.brought is not None:
+            total_rows.append(len(data))
+            data.append(self.total_row("Brought forward", running))
+        data.extend(self.rows[:count])
+        if count < len(self.rows):
+            running += sum(self.amounts[:count])
+            total_rows.append(len(data))
+            data.append(self.total_row("Carried forward", running))
+
+        last = len(self.header) - 1
+        table = Table(data, colWidths=self.col_widths)
+        table.setStyle(self.style)
+        table.setStyle(
+            [
+                command
+                for row in total_rows
+                for command in (
+                    ("SPAN", (0, row), (last - 1, row)),
+                    ("ALIGN", (0, row), (-1, row), "RIGHT"),
+                    ("FONTNAME", (0, row), (-1, row), "Helvetica-Bold"),
+                )
+            ]
+        )
+        return table
+
+    def most_rows(self, avail_width, avail_height):
+        """Upper bound of the rows that fit in ``avail_height``."""
+        row = Table([[""] * len(self.header)], colWidths=self.col_widths)
+        row.setStyle(self.style)
+        return int(avail_height // row.wrap(avail_width, avail_height)[1])
+
+    def wrap(self, avail_width, avail_height):
+        if len(self.rows) > self.most_rows(avail_width, avail_height):
+            # cannot fit: report more than available so the frame splits it
+            self.table = None
+            return sum(self.col_widths), avail_height + 1
+        self.table = self.part(len(self.rows))
+        return self.table.wrap(avail_width, avail_height)
+
+    def split(self, avail_width, avail_height):
+        def fits(count):
+            return self.part(count).wrap(avail_width, avail_height)[1] <= avail_height
+
+        if len(self.rows) <= self.most_rows(avail_width, avail_height) and fits(
+            len(self.rows)
+        ):
+            return [self.part(len(self.rows))]
+        # the largest row count whose part fits, by bisection
+        low, high = 0, min(
+            len(self.rows) - 1, self.most_rows(avail_width, avail_height)
+        )
+        while low < high:
+            middle = (low + high + 1) // 2
+            if fits(middle):
+                low = middle
+            else:
+                high = middle - 1
+        if not low:
+            return []
+        brought = (self.brought or 0) + sum(self.amounts[:low])
+        rest = RunningTotalTable(
+            self.header,
+            self.rows[low:],
+            self.amounts[low:],
+            self.col_widths,
+            self.style,
+            brought,
+        )
+        return [self.part(low), rest]
+
+    def draw(self):
+        self.table.drawOn(self.canv, 0, 0)
+
+
+def clear_template_cache():
+    get_styles.cache_clear()
+    product_table_style.cache_clear()
+    _seller_blocks.cache_clear()
+    _image_reader.cache_clear()
+
+
+def pdf_folder(doc_type):
+    """Directory under ``MEDIA_ROOT`` holding the PDFs of ``doc_type``."""
+    return "invoices" if doc_type == "invoice" else "quotations"
+
+
+def generate_pdf(data, filename="document.pdf", doc_type="invoice"):
+    save_dir = os.path.join(settings.MEDIA_ROOT, pdf_folder(doc_type))
+    os.makedirs(save_dir, exist_ok=True)
+    full_path = os.path.join(save_dir, filename)
+
+    build_pdf(data, full_path, doc_type)
+
+    relative_path = os.path.relpath(full_path, settings.MEDIA_ROOT)
+    logger.info("%s generated: %s", doc_type.capitalize(), relative_path)
+    return relative_path
+
+
+def render_pdf(data, doc_type="invoice"):
+    """Render ``data`` in memory and return the PDF bytes."""
+    buffer = io.BytesIO()
+    build_pdf(data, buffer, doc_type)
+    return buffer.getvalue()
+
+
+def build_pdf(data, target, doc_type="invoice"):
+    """
+    Render ``data`` as a PDF into ``target``, a file path or binary file, and
+    return the page count.
+    """
+    # invariant: same data, same bytes (no timestamp or random document id)
+    doc = SimpleDocTemplate(target, pagesize=A4, invariant=True)
+    doc.build(document_flowables(data, doc_type))
+    return doc.page
+
+
+class ChunkedDocTemplate(SimpleDocTemplate):
+    """
+    Document template whose story arrives in chunks. ``handle_flowable`` is
+    ReportLab's hook for taking the first flowable off a list; once it has
+    taken the last one off the story the next chunk is appended, so only
+    the current chunk is ever held in memory.
+    """
+
+    def build_chunks(self, chunks, **kwargs):
+        self.chunks = iter(chunks)
+        self.story = self.next_chunk()
+        self.build(self.story, **kwargs)
+
+    def next_chunk(self):
+        for chunk in self.chunks:
+            if chunk:
+                return list(chunk)
+        return []
+
+    def handle_flowable(self, flowables):
+        super().handle_flowable(flowables)
+        # also called on the internal list of pending page starts
+        if flowables is self.story and not flowables:
+            flowables.extend(self.next_chunk())
+
+
+def draw_page_number(canvas, doc):
+    canvas.saveState()
+    canvas.setFont("Helvetica", 8)
+    canvas.drawCentredString(PAGE_WIDTH / 2, 20, f"Page {doc.page}")
+    canvas.restoreState()
+
+
+def build_merged_pdf(documents, target, doc_type="invoice"):
+    """
+    Render every payload in ``documents`` into one PDF, each starting on a
+    new page, with page numbers running through the whole file. Flowables
+    are built one document at a time as the previous one is laid out, so
+    they never accumulate. Returns the page count.
+    """
+
+    def chunks():
+        for index, data in enumerate(documents):
+            if index:
+                yield [PageBreak()]
+            yield document_flowables(data, doc_type)
+
+    doc = ChunkedDocTemplate(target, pagesize=A4, invariant=True)
+    doc.build_chunks(
+        chunks(),
+        onFirstPage=draw_page_number,
+        onLaterPages=draw_page_number,
+    )
+    return doc.page
+
+
+def document_flowables(data, doc_type="invoice"):
+    """The flowables of one invoice or quotation."""
+    elements = []
+    styles = get_styles()
+
+    # --- Seller & Buyer ---
+    seller = data["party"]["user"]
+    buyer = data["party"]
+    blocks = seller_blocks(seller)
+    # --- Document Title ---
+    elements.append(Paragraph(doc_type.upper(), styles["Heading"]))
+
+    # --- Top-left Logo & Company Info Table ---
+    logo_element = logo_image(seller)
 
     # --- Document Header (Invoice/Quotation info) ---
     if doc_type == "invoice":
@@ -88,36 +450,22 @@ def generate_pdf(data, filename="document.pdf", doc_type="invoice"):
             <b>Date:</b> {data['date']}<br/>
             <b>Subject:</b> {data['subject']}
         """
-    # elements.append(Paragraph(header_info, styles["Normal"]))
-    # elements.append(Spacer(1, 12))
     header_paragraph = Paragraph(header_info, styles["Normal"])
 
-    # Combine logo and company info into one row
     # Combine logo, company info, and invoice/quotation info
     if logo_element:
         header_table = Table(
-            [[logo_element, company_paragraph, header_paragraph]],
-            colWidths=[logo_width, company_width, header_width],
+            [[logo_element, blocks.company, header_paragraph]],
+            colWidths=[LOGO_WIDTH, COMPANY_WIDTH, HEADER_WIDTH],
             hAlign="LEFT",
         )
     else:
         header_table = Table(
-            [[company_paragraph, header_paragraph]],
-            colWidths=[0.65 * usable_width, 0.35 * usable_width],
+            [[blocks.company, header_paragraph]],
+            colWidths=[0.65 * USABLE_WIDTH, 0.35 * USABLE_WIDTH],
             hAlign="LEFT",
         )
-
-    header_table.setStyle(
-        TableStyle(
-            [
-                ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                ("LEFTPADDING", (0, 0), (-1, -1), 0),
-                ("RIGHTPADDING", (0, 0), (-1, -1), 0),
-                ("TOPPADDING", (0, 0), (-1, -1), 0),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
-            ]
-        )
-    )
+    header_table.setStyle(HEADER_TABLE_STYLE)
 
     elements.append(header_table)
     elements.append(Spacer(1, 10))
@@ -136,30 +484,10 @@ def generate_pdf(data, filename="document.pdf", doc_type="invoice"):
 
     # --- Product Table ---
     details_key = "productdetails" if doc_type == "invoice" else "quotationdetails"
-    header_color = (
-        colors.HexColor("#4A90E2")
-        if doc_type == "invoice"
-        else colors.HexColor("#7B68EE")
-    )
-
-    product_data = [
-        [
-            "Description",
-            "HSN",
-            "Qty",
-            "Unit",
-            "Unit Price",
-            "CGST%",
-            "SGST%",
-            "IGST%",
-            "Total",
-        ]
-    ]
-    subtotal, gst_total = 0, 0
-    for p in data[details_key]:
-        item_price = float(p["unit_price"]) * p["product_quantity"]
-        subtotal += item_price
-        gst_total += float(p["single_item_total_gst"])
+    product_data = []
+    lines = data[details_key]
+    tax = compute_taxes(lines)
+    for p, line_tax in zip(lines, tax.lines):
         product_data.append(
             [
                 p["product_discription"],
@@ -170,32 +498,23 @@ def generate_pdf(data, filename="document.pdf", doc_type="invoice"):
                 f"{p['cgst']}%",
                 f"{p['sgst']}%",
                 f"{p['igst']}%",
-                f"{p['single_item_total_amount_after_tax']}",
+                f"{line_tax.amount_after_tax}",
             ]
         )
 
-    product_table = Table(
-        product_data, repeatRows=1, colWidths=[120, 50, 40, 50, 60, 50, 50, 50, 80]
-    )
-    product_table.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), header_color),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
-            ]
+    elements.append(
+        RunningTotalTable(
+            PRODUCT_HEADER,
+            product_data,
+            [line_tax.amount_after_tax for line_tax in tax.lines],
+            PRODUCT_COL_WIDTHS,
+            product_table_style(doc_type),
         )
     )
-    elements.append(product_table)
     elements.append(Spacer(1, 12))
 
     # --- Summary ---
-    if doc_type == "invoice":
-        grand_total = subtotal + gst_total
-    else:
-        grand_total = float(data["total_amount_after_gst"])
-        gst_total = float(data["total_gst_amount"])
+    subtotal, gst_total, grand_total = tax.subtotal, tax.total_gst, tax.total_amount
 
     summary_data = [
         ["Subtotal", f"{subtotal:.2f}"],
@@ -203,28 +522,13 @@ def generate_pdf(data, filename="document.pdf", doc_type="invoice"):
         ["Grand Total", f"{grand_total:.2f} INR"],
     ]
     summary_table = Table(summary_data, colWidths=[400, 120])
-    summary_table.setStyle(
-        TableStyle(
-            [
-                ("ALIGN", (0, 0), (-1, -1), "RIGHT"),
-                ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
-                ("LINEABOVE", (0, 0), (-1, 0), 0.5, colors.black),
-                ("LINEABOVE", (0, -1), (-1, -1), 1, colors.black),
-            ]
-        )
-    )
+    summary_table.setStyle(SUMMARY_TABLE_STYLE)
     elements.append(summary_table)
     elements.append(Spacer(1, 20))
 
     # --- Bank Details ---
-    elements.append(Paragraph("<b>Bank Details:</b>", styles["Bold"]))
-    bank_info = (
-        f"Bank: {seller.get('bank_name','')} | "
-        f"A/c: {seller.get('bank_account','')} | "
-        f"IFSC: {seller.get('bank_ifsc','')} | "
-        f"SWIFT: {seller.get('swift_code','')}"
-    )
-    elements.append(Paragraph(bank_info, styles["Normal"]))
+    elements.append(blocks.bank_label)
+    elements.append(blocks.bank)
     elements.append(Spacer(1, 20))
 
     # --- Terms & Conditions ---
@@ -233,242 +537,93 @@ def generate_pdf(data, filename="document.pdf", doc_type="invoice"):
     elements.append(Spacer(1, 30))
 
     # --- Signature ---
-    elements.append(Paragraph("For " + seller["company_name"], styles["RightAlign"]))
+    elements.append(blocks.signature)
     elements.append(Spacer(1, 20))
-    elements.append(Paragraph("Authorized Signatory", styles["RightAlign"]))
+    elements.append(blocks.signatory)
+
+    return elements
+
+
+REPORT_BILL_HEADER = [
+    "Bill No",
+    "Date",
+    "Party",
+    "Taxable",
+    "CGST",
+    "SGST",
+    "IGST",
+    "Total",
+]
+REPORT_COL_WIDTHS = [85, 55, 125, 65, 50, 50, 50, 55]
+REPORT_SUMMARY_STYLE = TableStyle(
+    [
+        ("ALIGN", (1, 0), (1, -1), "RIGHT"),
+        ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+    ]
+)
 
-    # --- Build PDF ---
-    doc = SimpleDocTemplate(full_path, pagesize=A4)
-    doc.build(elements)
 
-    relative_path = os.path.relpath(full_path, settings.MEDIA_ROOT)
-    print(f"{doc_type.capitalize()} generated: {relative_path}")
-    return relative_path
+def render_report_pdf(report):
+    """
+    Render the monthly GST report built by ``analytics.utils.monthly_report``
+    and return the PDF bytes.
+    """
+    styles = get_styles()
+    seller = report["seller"]
+    totals = report["totals"]
+    elements = [
+        Paragraph("GST REPORT", styles["Heading"]),
+        Paragraph(
+            f"""
+            <b>{seller['company_name']}</b><br/>
+            GSTIN: {seller['gstin'] or '-'}<br/>
+            Period: {report['month_name']} {report['year']}
+            """,
+            styles["Normal"],
+        ),
+        Spacer(1, 12),
+    ]
 
+    summary_data = [
+        ["Bills", f"{report['total_bills']}"],
+        ["Taxable value", f"{totals['total_amount_without_gst']:.2f}"],
+        ["CGST", f"{totals['total_cgst']:.2f}"],
+        ["SGST", f"{totals['total_sgst']:.2f}"],
+        ["IGST", f"{totals['total_igst']:.2f}"],
+        ["Invoice value", f"{totals['total_amount']:.2f}"],
+        ["GST payable (output tax)", f"{totals['total_gst']:.2f} INR"],
+    ]
+    summary_table = Table(summary_data, colWidths=[400, 120], hAlign="LEFT")
+    summary_table.setStyle(REPORT_SUMMARY_STYLE)
+    elements.append(summary_table)
+    elements.append(Spacer(1, 20))
+
+    bill_data = []
+    for bill in report["bills"]:
+        bill_data.append(
+            [
+                bill["billno"],
+                f"{bill['date']}",
+                Paragraph(bill["party__name"], styles["Normal"]),
+                f"{bill['subtotal_amount'] or 0:.2f}",
+                f"{bill['total_cgst_amount'] or 0:.2f}",
+                f"{bill['total_sgst_amount'] or 0:.2f}",
+                f"{bill['total_igst_amount'] or 0:.2f}",
+                f"{bill['total_amount_after_gst'] or 0:.2f}",
+            ]
+        )
+    elements.append(
+        RunningTotalTable(
+            REPORT_BILL_HEADER,
+            bill_data,
+            [bill["total_amount_after_gst"] or 0 for bill in report["bills"]],
+            REPORT_COL_WIDTHS,
+            product_table_style("invoice"),
+        )
+    )
 
-# import os
-# from reportlab.lib.pagesizes import A4
-# from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-# from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-# from reportlab.lib import colors
-# from django.conf import settings
-# from reportlab.platypus import Image
-
-
-# def generate_pdf(data, filename="document.pdf", doc_type="invoice"):
-#     """
-#     Generate PDF for Invoice or Quotation.
-#     :param data: dict containing invoice/quotation data
-#     :param filename: output PDF filename
-#     :param doc_type: "invoice" or "quotation"
-#     """
-#     elements = []
-#     seller = data["party"]["user"]
-
-#     # --- Logo ---
-#     logo_path = seller.get("logo")
-
-#     if logo_path:
-#         # assume logo_path is relative to MEDIA_ROOT
-#         logo_path_full = os.path.join(settings.MEDIA_ROOT, logo_path.split("/")[-1])
-#         if os.path.exists(logo_path_full):
-#             logo = Image(logo_path_full, width=40, height=30)  # adjust size
-#             logo.hAlign = "LEFT"
-#             elements.append(logo)
-#             elements.append(Spacer(1, 1))  # space after logo
-#     else:
-#         print("Logo not found")
-#     # Decide save folder
-#     folder = "invoices" if doc_type == "invoice" else "quotations"
-#     save_dir = os.path.join(settings.MEDIA_ROOT, folder)
-#     os.makedirs(save_dir, exist_ok=True)
-#     full_path = os.path.join(save_dir, filename)
-
-#     doc = SimpleDocTemplate(full_path, pagesize=A4)
-
-#     # --- Styles ---
-#     styles = getSampleStyleSheet()
-#     styles.add(
-#         ParagraphStyle(
-#             name="Heading", fontSize=14, leading=16, alignment=1, spaceAfter=12
-#         )
-#     )
-#     styles.add(
-#         ParagraphStyle(
-#             name="Bold",
-#             fontSize=10,
-#             leading=12,
-#             spaceAfter=6,
-#             fontName="Helvetica-Bold",
-#         )
-#     )
-#     styles.add(
-#         ParagraphStyle(name="RightAlign", fontSize=10, alignment=2, spaceBefore=40)
-#     )
-
-#     # --- Header ---
-#     elements.append(Paragraph(doc_type.upper(), styles["Heading"]))
-
-#     seller = data["party"]["user"]
-#     buyer = data["party"]
-
-#     # Document-specific header fields
-#     if doc_type == "invoice":
-#         header_info = f"""
-#             <b>Invoice No:</b> {data['billno']}<br/>
-#             <b>Date:</b> {data['date']}<br/>
-#             <b>Place of Supply:</b> {data.get('placeofsupply') or '-'}
-#         """
-#     else:  # quotation
-#         header_info = f"""
-#             <b>Quotation No:</b> {data['quotationno']}<br/>
-#             <b>Date:</b> {data['date']}<br/>
-#             <b>Subject:</b> {data['subject']}
-#         """
-
-#     header_table = [
-#         [
-#             Paragraph(
-#                 f"""
-#                 <b>{seller['company_name']}</b><br/>
-#                 {seller['address']}, {seller['city']}<br/>
-#                 GSTIN: {seller['gstin']} | PAN: {seller['pan']}<br/>
-#                 State: {seller['state']} ({seller['statecode']})<br/>
-#                 Mobile: {seller['mobile']}
-#                 """,
-#                 styles["Normal"],
-#             ),
-#             Paragraph(header_info, styles["Normal"]),
-#         ]
-#     ]
-#     t = Table(header_table, colWidths=[300, 200])
-#     t.setStyle(TableStyle([("VALIGN", (0, 0), (-1, -1), "TOP")]))
-#     elements.append(t)
-#     elements.append(Spacer(1, 12))
-
-#     # --- Buyer Info ---
-#     buyer_label = "Bill To:" if doc_type == "invoice" else "Quotation For:"
-#     elements.append(Paragraph(f"<b>{buyer_label}</b>", styles["Bold"]))
-#     elements.append(
-#         Paragraph(
-#             f"""
-#             {buyer['name']}<br/>
-#             {buyer['address']}, {buyer['city']}<br/>
-#             GSTIN: {buyer['gstin'] or '-'}<br/>
-#             State: {buyer['state']} ({buyer['statecode']})
-#             """,
-#             styles["Normal"],
-#         )
-#     )
-#     elements.append(Spacer(1, 12))
-
-#     # --- Product Table ---
-#     details_key = "productdetails" if doc_type == "invoice" else "quotationdetails"
-#     header_color = (
-#         colors.HexColor("#4A90E2")
-#         if doc_type == "invoice"
-#         else colors.HexColor("#7B68EE")
-#     )
-
-#     product_data = [
-#         [
-#             "Description",
-#             "HSN",
-#             "Qty",
-#             "Unit",
-#             "Unit Price",
-#             "CGST%",
-#             "SGST%",
-#             "IGST%",
-#             "Total",
-#         ]
-#     ]
-
-#     subtotal, gst_total = 0, 0
-#     for p in data[details_key]:
-#         item_price = float(p["unit_price"]) * p["product_quantity"]
-#         subtotal += item_price
-#         gst_total += float(p["single_item_total_gst"])
-#         product_data.append(
-#             [
-#                 p["product_discription"],
-#                 p.get("hsncode") or "-",
-#                 p["product_quantity"],
-#                 p.get("unit_type") or "-",
-#                 f"{p['unit_price']}",
-#                 f"{p['cgst']}%",
-#                 f"{p['sgst']}%",
-#                 f"{p['igst']}%",
-#                 f"{p['single_item_total_amount_after_tax']}",
-#             ]
-#         )
-
-#     product_table = Table(
-#         product_data, repeatRows=1, colWidths=[120, 50, 40, 50, 60, 50, 50, 50, 80]
-#     )
-#     product_table.setStyle(
-#         TableStyle(
-#             [
-#                 ("BACKGROUND", (0, 0), (-1, 0), header_color),
-#                 ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-#                 ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-#                 ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
-#             ]
-#         )
-#     )
-#     elements.append(product_table)
-#     elements.append(Spacer(1, 12))
-
-#     # --- Summary ---
-#     if doc_type == "invoice":
-#         grand_total = subtotal + gst_total
-#     else:  # quotation values come from API
-#         grand_total = float(data["total_amount_after_gst"])
-#         gst_total = float(data["total_gst_amount"])
-
-#     summary_data = [
-#         ["Subtotal", f"{subtotal:.2f}"],
-#         ["GST Total", f"{gst_total:.2f}"],
-#         ["Grand Total", f"{grand_total:.2f} INR"],
-#     ]
-#     summary_table = Table(summary_data, colWidths=[400, 120])
-#     summary_table.setStyle(
-#         TableStyle(
-#             [
-#                 ("ALIGN", (0, 0), (-1, -1), "RIGHT"),
-#                 ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
-#                 ("LINEABOVE", (0, 0), (-1, 0), 0.5, colors.black),
-#                 ("LINEABOVE", (0, -1), (-1, -1), 1, colors.black),
-#             ]
-#         )
-#     )
-#     elements.append(summary_table)
-#     elements.append(Spacer(1, 20))
-
-#     # --- Bank Details ---
-#     elements.append(Paragraph("<b>Bank Details:</b>", styles["Bold"]))
-#     bank_info = (
-#         f"Bank: {seller.get('bank_name', '')} | "
-#         f"A/c: {seller.get('bank_account', '')} | "
-#         f"IFSC: {seller.get('bank_ifsc', '')} | "
-#         f"SWIFT: {seller.get('swift_code', '')} "
-#     )
-#     elements.append(Paragraph(bank_info, styles["Normal"]))
-#     elements.append(Spacer(1, 20))
-
-#     # --- Terms & Conditions ---
-#     elements.append(Paragraph("<b>Terms & Conditions:</b>", styles["Bold"]))
-#     elements.append(Paragraph(data["tc"], styles["Normal"]))
-#     elements.append(Spacer(1, 30))
-
-#     # --- Signature Section ---
-#     elements.append(Paragraph("For " + seller["company_name"], styles["RightAlign"]))
-#     elements.append(Spacer(1, 20))
-#     elements.append(Paragraph("Authorized Signatory", styles["RightAlign"]))
-
-#     # Build PDF
-#     doc.build(elements)
-
-#     relative_path = os.path.relpath(full_path, settings.MEDIA_ROOT)
-#     print(f"{doc_type.capitalize()} generated: {relative_path}")
-#     return relative_path
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, invariant=True)
+    doc.build(elements, onFirstPage=draw_page_number, onLaterPages=draw_page_number)
+    return buffer.getvalue()
@@ -0,0 +1,78 @@
+"""
+Reporting periods as half-open ``[start, end)`` date ranges.
+
+Filtering with ``period.filter()`` gives ``date__gte``/``date__lt``
+predicates, which can use the index on ``date`` unlike ``date__year`` or
+``date__month``. Financial years run April to March and are named by the
+calendar year they start in, like ``utils.common.get_financial_year``.
+"""
+
+from collections import namedtuple
+from datetime import date, timedelta
+from functools import lru_cache
+
+from utils.common import get_financial_year
+
+
+class Period(namedtuple("Period", ["start", "end"])):
+    """The dates from ``start`` up to, not including, ``end``."""
+
+    __slots__ = ()
+
+    def filter(self, field="date"):
+        """Lookups selecting ``field`` within the period."""
+        return {f"{field}__gte": self.start, f"{field}__lt": self.end}
+
+    @property
+    def last_day(self):
+        return self.end - timedelta(days=1)
+
+    def __contains__(self, day):
+        return self.start <= day < self.end
+
+
+@lru_cache(maxsize=512)
+def month(year, month):
+    return Period(date(year, month, 1), date(year + month // 12, month % 12 + 1, 1))
+
+
+@lru_cache(maxsize=128)
+def quarter(financial_year, number):
+    """Quarter ``number`` (1-4) of ``financial_year``; Q1 is April to June."""
+    if not 1 <= number <= 4:
+        raise ValueError(f"quarter must be 1-4, not {number}")
+    year, first = financial_year + (number == 4), (3 * number) % 12 + 1
+    return Period(month(year, first).start, month(year, first + 2).end)
+
+
+@lru_cache(maxsize=64)
+def financial_year(financial_year):
+    return Period(date(financial_year, 4, 1), date(financial_year + 1, 4, 1))
+
+
+def month_of(day):
+    return month(day.year, day.month)
+
+
+def quarter_of(day):
+    return quarter(get_financial_year(day), (day.month - 4) % 12 // 3 + 1)
+
+
+def financial_year_of(day):
+    return financial_year(get_financial_year(day))
+
+
+def financial_year_to_date(today=None):
+    """The current financial year up to and including ``today``."""
+    today = today or date.today()
+    return Period(financial_year_of(today).start, today + timedelta(days=1))
+
+
+def between(first, last):
+    """
+    The dates from ``first`` to ``last``, both included. A ``last`` of
+    ``date.max`` ends the period just before it, the day after is not a date.
+    """
+    if last == date.max:
+        return Period(first, date.max)
+    return Period(first, last + timedelta(days=1))
@@ -0,0 +1,82 @@
+"""
+Query plan regression checks for the test suite.
+
+``QueryPlanTestCase`` seeds a few synthetic tenants and fails when a query
+reads a whole table instead of using an index, judged from the plan that
+``QuerySet.explain()`` (or ``EXPLAIN`` of captured SQL) returns.
+"""
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from analytics.management.seed import seed_tenant
+
+
+def explain(sql):
+    """The plan of raw ``sql`` in the form ``QuerySet.explain()`` returns."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return "\n".join(" ".join(map(str, row)) for row in cursor.fetchall())
+        cursor.execute(f"EXPLAIN {sql}")
+        return "\n".join(row[0] for row in cursor.fetchall())
+
+
+def full_scans(plan):
+    """The steps of ``plan`` that read a whole table."""
+    steps = [line.strip() for line in plan.splitlines()]
+    if connection.vendor != "sqlite":
+        return [step for step in steps if "Seq Scan" in step]
+    scans = []
+    for step in steps:
+        # "<id> <parent> <notused> <detail>"
+        detail = step.split(" ", 3)[-1]
+        if (
+            detail.startswith("SCAN ")
+            and "CONSTANT ROW" not in detail
+            # derived tables are already filtered by the inner plan
+            and not detail.startswith(("SCAN subquery", "SCAN (subquery"))
+        ):
+            scans.append(detail)
+    return scans
+
+
+class QueryPlanTestCase(TestCase):
+    """Seeds ``tenants`` accounts; ``user`` is the first one."""
+
+    tenants = 3
+    bills = 150
+    lines = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [seed_tenant(n, cls.bills, cls.lines) for n in range(cls.tenants)]
+        cls.user = users[0]
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # only fall back to a sequential scan when no index applies
+                cursor.execute("SET enable_seqscan = off")
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def assertUsesIndexes(self, queryset):
+        plan = queryset.explain()
+        self.assertEqual(full_scans(plan), [], f"{queryset.query}\n{plan}")
+
+    def assertEndpointUsesIndexes(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get(url)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, 200, url)
+        self.assertTrue(queries.captured_queries, f"{url} ran no queries")
+        for query in queries.captured_queries:
+            sql = query["sql"]
+            if sql.startswith("SELECT"):
+                plan = explain(sql)
+                self.assertEqual(full_scans(plan), [], f"{url}\n{sql}\n{plan}")